@@ -0,0 +1,339 @@
+"""End-to-end benchmarks of the tools against the local stub server.
+
+Starts benchmarks/stub_server.py, then runs each scenario in its own
+subprocess (so CPU time and peak RSS belong to that scenario alone) with the
+tools pointed at the stub through LETTERBOXD_BASE_URL / YTS_API_URL and an
+empty cache directory. Every HTTP request is timed at the transport adapter,
+and the results are printed and saved as JSON for comparing commits.
+
+Usage:
+    python benchmarks/bench_e2e.py [--scenario scrape_letterboxd ...] [--latency-ms 20] [--error-rate 0.02]
+    python benchmarks/bench_e2e.py --compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+RESULTS_DIR = os.path.join(HERE, "results")
+TITLES = ["Heat", "Ronin", "Thief", "Collateral", "The Insider", "Manhunter", "Miami Vice", "Public Enemies", "Blackhat", "Ali", "Ferrari", "Alien"]
+
+# The stub stands in for Letterboxd at 127.0.0.1 and for YTS at localhost, so each gets its own per-host limiter
+UNTHROTTLED = {"rate": 1e6, "max_rate": 1e6, "concurrency": 64, "max_concurrency": 64}
+
+
+class RequestRecorder:
+    """Times every request at the HTTPAdapter, below the tools' cache and rate limiter."""
+
+    def __init__(self):
+        self.latencies = []
+        self.pages = 0
+        self.errors = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def install(self):
+        from requests.adapters import HTTPAdapter
+        send = HTTPAdapter.send
+        recorder = self
+
+        def timed_send(adapter, request, **kwargs):
+            start = time.perf_counter()
+            response = send(adapter, request, **kwargs)
+            elapsed = time.perf_counter() - start
+            with recorder._lock:
+                recorder.latencies.append(elapsed)
+                recorder.pages += "/page/" in request.url
+                recorder.errors += response.status_code >= 400
+                recorder.bytes += int(response.headers.get("Content-Length") or 0)
+            return response
+
+        HTTPAdapter.send = timed_send
+
+    def reset(self):
+        with self._lock:
+            self.latencies, self.pages, self.errors, self.bytes = [], 0, 0, 0
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, round(fraction * (len(values) - 1)))]
+
+
+def use_tool(directory, throttled, parse_workers=0):
+    """Puts one tool's directory and the shared modules on sys.path, registers the stub hosts with the rate limiter and starts the parse pool."""
+    sys.path[:0] = [os.path.join(ROOT, directory), ROOT]
+    from letterboxd_common.rate_limit import DEFAULT_HOST_SETTINGS, DEFAULT_LIMITER
+    DEFAULT_LIMITER.host_settings.update({
+        "127.0.0.1": DEFAULT_HOST_SETTINGS["letterboxd.com"] if throttled else UNTHROTTLED,
+        "localhost": DEFAULT_HOST_SETTINGS["yts.mx"] if throttled else UNTHROTTLED,
+    })
+    if parse_workers:
+        from letterboxd_common.parse_pool import PARSE_POOL
+        PARSE_POOL.start(parse_workers)
+
+
+def load_watchlist(config, cache_dir):
+    use_tool("letterboxd-watchlist-wishlist", config["throttled"], config["parse_workers"])
+    spec = importlib.util.spec_from_file_location("watchlist", os.path.join(ROOT, "letterboxd-watchlist-wishlist", "letterboxd-watchlist-wishlist.py"))
+    watchlist = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(watchlist)
+    from letterboxd_common.film_catalog import FilmCatalog
+    from letterboxd_common.http_cache import CachedSession
+    from library_index import LibraryIndex
+    watchlist.SESSION = CachedSession(cache_dir, enabled=False, pool_maxsize=watchlist.MAX_WORKERS)
+    watchlist.CATALOG = FilmCatalog(os.path.join(cache_dir, "films.sqlite3"))
+    os.makedirs(os.path.join(cache_dir, "library"))
+    watchlist.LIBRARY = LibraryIndex(os.path.join(cache_dir, "library"), os.path.join(cache_dir, "library.json"))
+    return watchlist
+
+
+def run_scrape_letterboxd(config, cache_dir, recorder):
+    use_tool("letterboxd-top-rated", config["throttled"], config["parse_workers"])
+    import letterboxd_top_rated
+    session = letterboxd_top_rated.create_session(config["concurrency"], cache_dir, use_cache=False)
+    return len(letterboxd_top_rated.scrape_letterboxd("bench", config["concurrency"], session))
+
+
+def run_scrape_users(config, cache_dir, recorder):
+    use_tool("letterboxd-top-rated", config["throttled"], config["parse_workers"])
+    import letterboxd_top_rated
+    session = letterboxd_top_rated.create_session(config["concurrency"], cache_dir, use_cache=False)
+    users = [f"bench{number}" for number in range(config["users"])]
+    return sum(map(len, letterboxd_top_rated.scrape_users(users, config["concurrency"], session).values()))
+
+
+def run_similarity(config, cache_dir, recorder):
+    use_tool("letterboxd-top-rated", config["throttled"], config["parse_workers"])
+    import letterboxd_top_rated
+    from rating_vectors import RatingVectors
+    session = letterboxd_top_rated.create_session(config["concurrency"], cache_dir, use_cache=False)
+    vectors = RatingVectors()
+    for user in ("bench1", "bench2", "bench3", "bench4"):
+        films = letterboxd_top_rated.scrape_ratings(user, config["concurrency"], session)
+        vectors.add_user(user, ((film["link"], film["rating"]) for film in films))
+    vectors.similarity()
+    return len(vectors.films)
+
+
+def run_get_user_films(config, cache_dir, recorder):
+    use_tool("letterboxd-top-rated", config["throttled"], config["parse_workers"])
+    import streamlit_letterboxd_top_rated
+    return len(streamlit_letterboxd_top_rated.get_user_films("bench", config["concurrency"]))
+
+
+def run_scrape_watchlist(config, cache_dir, recorder):
+    watchlist = load_watchlist(config, cache_dir)
+    return len(watchlist.scrape_watchlist("bench"))
+
+
+def run_process_movie(config, cache_dir, recorder):
+    watchlist = load_watchlist(config, cache_dir)
+    movies = watchlist.scrape_watchlist("bench")
+    recorder.reset()  # Only the lookups and downloads are measured
+    output_dir = os.path.join(cache_dir, "torrents")
+    os.makedirs(output_dir)
+    missing_files, skipped_movies, downloaded_movies = [], [], []
+    with ThreadPoolExecutor(max_workers=watchlist.MAX_WORKERS) as executor:
+        futures = [executor.submit(watchlist.process_movie, movie, missing_files, skipped_movies, downloaded_movies, output_dir) for movie in movies]
+        for future in as_completed(futures):
+            future.result()
+    return len(downloaded_movies)
+
+
+def run_sync_yts_mirror(config, cache_dir, recorder):
+    watchlist = load_watchlist(config, cache_dir)
+    from yts_mirror import YTSMirror
+    mirror = YTSMirror(os.path.join(cache_dir, "yts.sqlite3"))
+    mirror.sync(watchlist.SESSION, watchlist.YTS_API_URL)
+    mirror.sync(watchlist.SESSION, watchlist.YTS_API_URL)  # Up to date, so one page
+    movies = watchlist.scrape_watchlist("bench")
+    return sum(mirror.match(movie["Name"], int(movie["Year"])) is not None for movie in movies if str(movie["Year"]).isdigit())
+
+
+def run_generate_links(config, cache_dir, recorder):
+    use_tool("letterboxd-fan-finder", config["throttled"])
+    import letterboxd_fan_finder
+    titles = TITLES[:config["titles"]]
+    pages = -(-letterboxd_fan_finder.count_combinations(titles) // letterboxd_fan_finder.PER_PAGE)
+    return sum(len(letterboxd_fan_finder.generate_links(titles, page)) for page in range(1, pages + 1))
+
+
+def run_find_fans(config, cache_dir, recorder):
+    use_tool("letterboxd-fan-finder", config["throttled"])
+    import fan_search
+    from letterboxd_common.http_cache import CachedSession
+    session = CachedSession(cache_dir, enabled=False, pool_maxsize=fan_search.MAX_WORKERS)
+    return len(fan_search.find_fans(TITLES[:min(config["titles"], 6)], session))
+
+
+SCENARIOS = {
+    "scrape_letterboxd": run_scrape_letterboxd,
+    "scrape_users": run_scrape_users,
+    "similarity": run_similarity,
+    "get_user_films": run_get_user_films,
+    "scrape_watchlist": run_scrape_watchlist,
+    "process_movie": run_process_movie,
+    "sync_yts_mirror": run_sync_yts_mirror,
+    "generate_links": run_generate_links,
+    "find_fans": run_find_fans,
+}
+
+
+def measure(scenario, config):
+    """Runs one scenario in this process and returns its measurements."""
+    recorder = RequestRecorder()
+    recorder.install()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        usage_before = resource.getrusage(resource.RUSAGE_SELF)
+        children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        start = time.perf_counter()
+        items = SCENARIOS[scenario](config, cache_dir, recorder)
+        wall = time.perf_counter() - start
+        if "letterboxd_common.parse_pool" in sys.modules:
+            sys.modules["letterboxd_common.parse_pool"].PARSE_POOL.shutdown()  # Reaps the parse processes so their CPU time is counted
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    latencies = recorder.latencies
+    return {
+        "scenario": scenario,
+        "items": items,
+        "wall_s": wall,
+        "cpu_s": (usage.ru_utime - usage_before.ru_utime) + (usage.ru_stime - usage_before.ru_stime)
+                 + (children.ru_utime - children_before.ru_utime) + (children.ru_stime - children_before.ru_stime),
+        # ru_maxrss is KiB on Linux and bytes on macOS
+        "peak_rss_kib": usage.ru_maxrss // (1024 if sys.platform == "darwin" else 1),
+        "requests": len(latencies),
+        "pages": recorder.pages,
+        "errors": recorder.errors,
+        "bytes": recorder.bytes,
+        "requests_per_s": len(latencies) / wall if wall else None,
+        "pages_per_s": recorder.pages / wall if wall else None,
+        "p50_ms": percentile(latencies, 0.5) * 1000 if latencies else None,
+        "p99_ms": percentile(latencies, 0.99) * 1000 if latencies else None,
+    }
+
+
+def start_stub(args):
+    command = [sys.executable, os.path.join(HERE, "stub_server.py"), "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+               "--error-rate", str(args.error_rate), "--error-status", str(args.error_status),
+               "--rated-pages", str(args.rated_pages), "--watchlist-pages", str(args.watchlist_pages), "--yts-catalog", str(args.yts_catalog), "--seed", str(args.seed)]
+    if args.retry_after is not None:
+        command += ["--retry-after", str(args.retry_after)]
+    stub = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    port = int(stub.stdout.readline().split()[1])
+    return stub, port
+
+
+def run_isolated(scenario, config, port):
+    env = dict(os.environ, LETTERBOXD_BASE_URL=f"http://127.0.0.1:{port}", YTS_API_URL=f"http://localhost:{port}/api/v2/")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env["LETTERBOXD_CACHE_DIR"] = cache_dir
+        output = subprocess.run([sys.executable, __file__, "--worker", scenario, "--config", json.dumps(config)], env=env, cwd=cache_dir,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def format_number(value, digits=1):
+    return "-" if value is None else f"{value:.{digits}f}"
+
+
+def print_results(results):
+    print(f"{'scenario':<18} {'items':>6} {'requests':>8} {'pages/s':>8} {'p50 ms':>7} {'p99 ms':>7} {'errors':>6} {'wall s':>7} {'CPU s':>6} {'peak RSS MiB':>12}")
+    for result in results:
+        print(f"{result['scenario']:<18} {result['items']:>6} {result['requests']:>8} {format_number(result['pages_per_s']):>8} "
+              f"{format_number(result['p50_ms']):>7} {format_number(result['p99_ms']):>7} {result['errors']:>6} {result['wall_s']:>7.2f} "
+              f"{result['cpu_s']:>6.2f} {result['peak_rss_kib'] / 1024:>12.1f}")
+
+
+def compare(old_path, new_path):
+    """Prints each scenario's metrics from two result files side by side with the relative change."""
+    with open(old_path, encoding="utf-8") as old_file, open(new_path, encoding="utf-8") as new_file:
+        old, new = json.load(old_file), json.load(new_file)
+    old_results = {result["scenario"]: result for result in old["results"]}
+    print(f"{old['commit']} -> {new['commit']}")
+    for result in new["results"]:
+        before = old_results.get(result["scenario"])
+        if not before:
+            continue
+        print(result["scenario"])
+        for metric in ("wall_s", "cpu_s", "peak_rss_kib", "pages_per_s", "p50_ms", "p99_ms"):
+            if before[metric] is None or result[metric] is None:
+                continue
+            change = (result[metric] - before[metric]) / before[metric] * 100 if before[metric] else 0.0
+            print(f"  {metric:<13} {before[metric]:>12.2f} {result[metric]:>12.2f} {change:>+8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run end-to-end benchmarks against the local stub server and save the results as JSON.")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Scenario(s) to run (default: all).")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrency passed to the top-rated scrapers.")
+    parser.add_argument("--users", type=int, default=20, help="Users scraped as one batch by scrape_users.")
+    parser.add_argument("--titles", type=int, default=10, help="Movie titles for generate_links (find_fans uses at most 6).")
+    parser.add_argument("--rated-pages", type=int, default=20, help="Pages of 5-star ratings served per user.")
+    parser.add_argument("--watchlist-pages", type=int, default=3, help="Pages of watchlist served per user.")
+    parser.add_argument("--yts-catalog", type=int, default=1000, help="Filler movies in the YTS catalog synced by sync_yts_mirror.")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Stub response delay.")
+    parser.add_argument("--jitter-ms", type=float, default=5.0, help="Random +/- variation of the delay.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stub responses replaced by --error-status.")
+    parser.add_argument("--error-status", type=int, default=503, help="Status code of injected errors.")
+    parser.add_argument("--retry-after", type=int, help="Retry-After seconds sent with injected errors.")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the stub's jitter and error injection.")
+    parser.add_argument("--parse-workers", type=int, default=0, help="Parse in this many worker processes (the tools' --parse-workers).")
+    parser.add_argument("--unthrottled", action="store_true", help="Lift the per-host rate limits to measure the tools' own overhead.")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<commit>-<timestamp>.json).")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files instead of running.")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--config", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, json.loads(args.config))))
+        return
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    config = {"concurrency": args.concurrency, "users": args.users, "titles": args.titles, "throttled": not args.unthrottled,
+              "parse_workers": args.parse_workers}
+    stub, port = start_stub(args)
+    try:
+        results = [run_isolated(scenario, config, port) for scenario in args.scenario or SCENARIOS]
+    finally:
+        stub.terminate()
+        stub.wait()
+    print_results(results)
+
+    commit = git_commit()
+    created_at = datetime.now(timezone.utc)
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}-{created_at.strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    stub_config = {name: getattr(args, name) for name in ("rated_pages", "watchlist_pages", "yts_catalog", "latency_ms", "jitter_ms", "error_rate", "error_status", "retry_after", "seed")}
+    with open(output, "w", encoding="utf-8") as result_file:
+        json.dump({"commit": commit, "created_at": created_at.isoformat(), "python": platform.python_version(), "platform": platform.platform(),
+                   "config": dict(config, **stub_config), "results": results}, result_file, indent=2)
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Benchmarks how much memory a scraped result set costs per 100k films.
+
+Each layout builds the same films, with distinct titles and links, from the
+posters of the saved ratings page and keeps them all alive:
+
+- ``dicts``: one {'title', 'link', 'rating'} dict per film, as the scrapers used to return
+- ``records``: one film_records.RatedFilm per film, as they return now
+- ``columns``: one film_records.FilmColumns batch, as batch output and the title index use
+- ``pages-<backend>``: the poster dicts of every parsed page, to check that no backend keeps its parse tree alive
+
+Every layout runs in its own subprocess and reports its peak RSS growth,
+which also covers lxml's C allocations, scaled to 100k films.
+
+Usage:
+    python benchmarks/bench_memory.py [--films 200000] [--layout records ...]
+"""
+import argparse
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(HERE, "..", "letterboxd-top-rated"), os.path.dirname(HERE)]
+
+from letterboxd_common.film_records import FilmColumns, RatedFilm  # noqa: E402
+from letterboxd_top_rated import FILM_SCHEMA, scrape_ratings_page  # noqa: E402
+from letterboxd_common.poster_grid import BACKENDS, extract_page  # noqa: E402
+
+FIXTURE = os.path.join(HERE, "fixtures", "ratings-page.html")
+LAYOUTS = ["dicts", "records", "columns"] + [f"pages-{backend}" for backend in sorted(BACKENDS)]
+
+
+def film_values(posters, count):
+    """Yields (title, href, rating) for count films, cycling through the posters with a distinct suffix each time round."""
+    template = [(film.title, film.path, film.rating) for film in scrape_ratings_page(posters)]
+    for position in range(count):
+        title, href, rating = template[position % len(template)]
+        lap = position // len(template)
+        yield f"{title} {lap}", f"{href[:-1]}-{lap}/", rating
+
+
+def build(layout, html, count):
+    if layout.startswith("pages-"):
+        pages, films = [], 0
+        backend = layout[len("pages-"):]
+        while films < count:
+            pages.append(extract_page(html, backend)[0])
+            films += len(pages[-1])
+        return pages
+    posters, _ = extract_page(html)
+    if layout == "dicts":
+        return [{"title": title, "link": f"https://letterboxd.com{href}", "rating": rating} for title, href, rating in film_values(posters, count)]
+    if layout == "records":
+        return [RatedFilm(title, href, rating) for title, href, rating in film_values(posters, count)]
+    films = FilmColumns(FILM_SCHEMA)
+    for title, href, rating in film_values(posters, count):
+        films.append((title, f"https://letterboxd.com{href}", rating))
+    return films
+
+
+def measure(layout, count):
+    """Builds one layout in this process and returns its memory cost per 100k films."""
+    with open(FIXTURE, "rb") as page:
+        html = page.read()
+    build(layout, html, 100)  # warm up imports and caches before taking the RSS baseline
+    gc.collect()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result = build(layout, html, count)
+    gc.collect()
+    rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+
+    films = sum(len(posters) for posters in result) if layout.startswith("pages-") else len(result)
+    return {
+        "layout": layout,
+        "films": films,
+        "rss_mib_per_100k": rss_growth / 1024 * 100_000 / films,
+    }
+
+
+def run_isolated(layout, count):
+    output = subprocess.check_output([sys.executable, __file__, "--worker", layout, "--films", str(count)])
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the memory cost of scraped film result sets per 100k films.")
+    parser.add_argument("--films", type=int, default=200_000, help="Films built per layout.")
+    parser.add_argument("--layout", action="append", choices=LAYOUTS, help="Layout(s) to benchmark (default: all).")
+    parser.add_argument("--worker", choices=LAYOUTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.films)))
+        return
+
+    print(f"{'layout':<14} {'films':>8} {'RSS MiB/100k':>13}")
+    for layout in args.layout or LAYOUTS:
+        result = run_isolated(layout, args.films)
+        print(f"{result['layout']:<14} {result['films']:>8} {result['rss_mib_per_100k']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
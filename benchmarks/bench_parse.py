@@ -0,0 +1,80 @@
+"""Benchmarks the poster-grid extraction backends on the saved fixture pages.
+
+Reports milliseconds per page, the peak Python heap during one parse
+(tracemalloc) and the peak RSS growth over the whole run. Each backend/fixture
+pair runs in its own subprocess so that RSS figures, which also cover lxml's
+C allocations, are not polluted by earlier runs.
+
+Usage:
+    python benchmarks/bench_parse.py [--iterations 50] [--backend lxml ...]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from letterboxd_common.poster_grid import BACKENDS, extract_page  # noqa: E402
+
+FIXTURES = [os.path.join(HERE, "fixtures", name) for name in ("rated-5-page.html", "ratings-page.html", "watchlist-page.html")]
+
+
+def measure(backend, fixture, iterations):
+    """Parses one fixture repeatedly with one backend and returns its measurements."""
+    with open(fixture, "rb") as page:
+        html = page.read()
+    extract_page(html, backend)  # warm up imports and caches before taking the RSS baseline
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    tracemalloc.start()
+    posters, _ = extract_page(html, backend)
+    heap_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        extract_page(html, backend)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "backend": backend,
+        "fixture": os.path.basename(fixture),
+        "posters": len(posters),
+        "ms_per_page": elapsed * 1000 / iterations,
+        "heap_peak_kib": heap_peak / 1024,
+        "rss_growth_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before,
+    }
+
+
+def run_isolated(backend, fixture, iterations):
+    output = subprocess.check_output([sys.executable, __file__, "--worker", backend, fixture, "--iterations", str(iterations)])
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark poster-grid extraction backends on saved fixture pages.")
+    parser.add_argument("--iterations", type=int, default=50, help="Parses per backend and fixture.")
+    parser.add_argument("--backend", action="append", choices=sorted(BACKENDS), help="Backend(s) to benchmark (default: all available).")
+    parser.add_argument("--worker", nargs=2, metavar=("BACKEND", "FIXTURE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(*args.worker, args.iterations)))
+        return
+
+    print(f"{'fixture':<22} {'backend':<8} {'posters':>7} {'ms/page':>9} {'heap peak KiB':>14} {'RSS growth KiB':>15}")
+    for fixture in FIXTURES:
+        for backend in args.backend or sorted(BACKENDS):
+            result = run_isolated(backend, fixture, args.iterations)
+            print(f"{result['fixture']:<22} {result['backend']:<8} {result['posters']:>7} {result['ms_per_page']:>9.2f} "
+                  f"{result['heap_peak_kib']:>14.0f} {result['rss_growth_kib']:>15}")
+
+
+if __name__ == "__main__":
+    main()
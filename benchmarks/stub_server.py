@@ -0,0 +1,260 @@
+"""Local stand-in for letterboxd.com and the YTS API, serving the saved fixtures.
+
+Every page is built from a fixture: poster-grid pages get per-page film slugs
+and titles and a pagination block for the configured page count (full
+ratings pages also get a per-user subset of films and ratings), film pages
+carry the year from the slug, YTS searches answer for any title the stub has
+served, the YTS date_added listing pages through a catalog of filler movies
+plus every watchlist film (for syncing a YTS mirror), and fan searches return a deterministic subset of the fixture's
+members for each combination of films. Latency (with jitter) and error
+responses can be injected to see how the tools behave under a slow or
+throttling server; the server's error_rate can be changed while it runs.
+
+Usage:
+    python benchmarks/stub_server.py --port 8000 --latency-ms 20 --error-rate 0.02
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+POSTER = re.compile(r'<li class="poster-container">.*?</li>', re.DOTALL)
+PAGINATION = re.compile(r'(<div class="paginate-pages">).*?(</div>)', re.DOTALL)
+SLUG = re.compile(r'(data-film-slug="|/film/)([a-z0-9-]+?)(-\d{4})?(["/])')
+ALT = re.compile(r'alt="([^"]*)"')
+FILM_SLUG = re.compile(r'data-film-slug="([^"]+)"')
+RATING = re.compile(r'<span class="rating -micro -darker rated-\d+">[^<]*</span>')
+MEMBER = re.compile(r'\s*<li class="search-result -person">.*?</li>', re.DOTALL)
+TORRENT_BODY = b"d8:announce35:udp://tracker.example.invalid:1337/4:infod6:lengthi1095216660e4:name8:City.mkv12:piece lengthi262144e6:pieces" + b"0" * 16384 + b"ee"
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as fixture:
+        return fixture.read()
+
+
+def stable_hash(text):
+    return zlib.crc32(text.encode("utf-8"))
+
+
+class StubSite:
+    """Builds (and memoizes) the responses for each route from the fixtures."""
+
+    def __init__(self, rated_pages=20, watchlist_pages=5, yts_catalog=1000):
+        self.yts_catalog = yts_catalog
+        self.catalog = None
+        self.pages = {"rated": rated_pages, "ratings": rated_pages, "watchlist": watchlist_pages}
+        self.templates = {"rated": read_fixture("rated-5-page.html"), "ratings": read_fixture("ratings-page.html"),
+                          "watchlist": read_fixture("watchlist-page.html")}
+        self.film_page = read_fixture("film-page.html")
+        self.yts_list = json.loads(read_fixture("yts-list-movies.json"))
+        search_page = read_fixture("fan-search-page.html")
+        members = MEMBER.findall(search_page)
+        self.members = [(re.search(r'href="/([^/]+)/', member).group(1), member) for member in members]
+        self.search_page = MEMBER.sub("", search_page, count=len(members) - 1).replace(members[-1], "{members}")
+        self.movies = {}
+        self.movies_by_id = {}
+        self.rendered = {}
+        self.lock = threading.Lock()
+
+    def grid_page(self, kind, page):
+        key = (kind, page)
+        with self.lock:
+            if key in self.rendered:
+                return self.rendered[key]
+        html = self.templates[kind]
+        if page > self.pages[kind]:
+            html = POSTER.sub("", html)
+        else:
+            # Distinct films on every page: prefix slugs and suffix titles with the page number
+            html = SLUG.sub(lambda match: f"{match.group(1)}{kind[:2]}{page}-{match.group(2)}{match.group(3) or ''}{match.group(4)}", html)
+            html = ALT.sub(lambda match: f'alt="{match.group(1)} {kind[:2].title()}{page}"', html)
+            for poster in POSTER.findall(html):
+                self.register(ALT.search(poster).group(1), year_from_slug(FILM_SLUG.search(poster).group(1)))
+        links = "".join(f'<li class="paginate-page"><a href="page/{number}/">{number}</a></li>' for number in range(1, self.pages[kind] + 1))
+        html = PAGINATION.sub(lambda match: f"{match.group(1)}<ul>{links}</ul>{match.group(2)}", html)
+        with self.lock:
+            self.rendered[key] = html
+        return html
+
+    def personalize(self, html, user):
+        """Drops about a quarter of the page's films and re-rates the rest, both decided per user, so users differ."""
+        def poster(match):
+            slug = FILM_SLUG.search(match.group(0)).group(1)
+            score = stable_hash(f"{user}:{slug}")
+            if score % 4 == 0:
+                return ""
+            rating = score // 4 % 10 + 1
+            stars = "★" * (rating // 2) + "½" * (rating % 2)
+            return RATING.sub(f'<span class="rating -micro -darker rated-{rating}"> {stars} </span>', match.group(0))
+        return POSTER.sub(poster, html)
+
+    def register(self, title, year):
+        movie_id = stable_hash(f"{title}|{year}") % 10_000_000
+        with self.lock:
+            self.movies.setdefault(title.lower(), {})[movie_id] = (title, year)
+            self.movies_by_id[movie_id] = (title, year)
+
+    def yts_movie(self, movie_id, title, year, host):
+        movie = copy.deepcopy(self.yts_list["data"]["movies"][0])
+        movie.update(id=movie_id, title=title, title_english=title, title_long=f"{title} ({year})", year=year)
+        for torrent in movie["torrents"]:
+            torrent["url"] = f"http://{host}/torrent/download/{movie_id}-{torrent['quality']}"
+        return movie
+
+    def yts_search(self, query, host):
+        with self.lock:
+            found = list(self.movies.get(query.lower(), {}).items())
+        response = copy.deepcopy(self.yts_list)
+        response["data"]["movies"] = [self.yts_movie(movie_id, title, year, host) for movie_id, (title, year) in found]
+        response["data"]["movie_count"] = len(found)
+        if not found:
+            del response["data"]["movies"]
+        return response
+
+    def yts_listing(self, page, limit, host):
+        """list_movies.json sorted by date_added, newest first."""
+        with self.lock:
+            catalog = self.catalog
+        if catalog is None:
+            for number in range(1, self.yts_catalog + 1):
+                self.register(f"Catalog Film {number}", 1950 + number % 75)
+            for number in range(1, self.pages["watchlist"] + 1):
+                self.grid_page("watchlist", number)  # Registers the watchlist's films
+            with self.lock:
+                self.catalog = catalog = sorted(self.movies_by_id, key=lambda movie_id: (-upload_time(movie_id), movie_id))
+        response = copy.deepcopy(self.yts_list)
+        movies = []
+        for movie_id in catalog[(page - 1) * limit:page * limit]:
+            with self.lock:
+                title, year = self.movies_by_id[movie_id]
+            movie = self.yts_movie(movie_id, title, year, host)
+            movie["date_uploaded_unix"] = upload_time(movie_id)
+            movies.append(movie)
+        response["data"].update(movies=movies, movie_count=len(catalog), limit=limit, page_number=page)
+        if not movies:
+            del response["data"]["movies"]
+        return response
+
+    def yts_details(self, movie_id, host):
+        with self.lock:
+            found = self.movies_by_id.get(movie_id)
+        movie = self.yts_movie(movie_id, *found, host) if found else {}
+        return {"status": "ok", "data": {"movie": movie}}
+
+    def fan_search(self, slugs):
+        # A member is a fan of roughly a third of all films, decided by a hash so every run agrees
+        members = [member for username, member in self.members if all(stable_hash(f"{username}:{slug}") % 3 == 0 for slug in slugs)]
+        return self.search_page.replace("{members}", "".join(members))
+
+
+def upload_time(movie_id):
+    return 1_500_000_000 + stable_hash(f"uploaded:{movie_id}") % 200_000_000
+
+
+def year_from_slug(slug):
+    match = re.search(r"-(\d{4})$", slug)
+    return int(match.group(1)) if match else None
+
+
+def make_handler(site, latency, jitter, error_status, retry_after, seed):
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def send_body(self, status, body, content_type, headers=()):
+            if isinstance(body, str):
+                body = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            with rng_lock:
+                delay = max(0.0, latency + rng.uniform(-jitter, jitter))
+                fail = rng.random() < self.server.error_rate
+            time.sleep(delay)
+            if fail:
+                headers = [("Retry-After", str(retry_after))] if retry_after is not None else []
+                return self.send_body(error_status, "Injected error", "text/plain", headers)
+
+            url = urlsplit(self.path)
+            path, query = unquote(url.path), parse_qs(url.query)
+            host = self.headers.get("Host", "localhost")
+            grid = re.match(r"^/([^/]+)/(films/rated/5|films/ratings|watchlist)/page/(\d+)/$", path)
+            if grid:
+                kind = {"films/rated/5": "rated", "films/ratings": "ratings", "watchlist": "watchlist"}[grid.group(2)]
+                html = site.grid_page(kind, int(grid.group(3)))
+                if kind == "ratings":
+                    html = site.personalize(html, grid.group(1))
+                return self.send_body(200, html, "text/html; charset=utf-8")
+            film = re.match(r"^/film/([^/]+)/$", path)
+            if film:
+                year = year_from_slug(film.group(1)) or 2000
+                html = re.sub(r'/films/year/\d{4}/">\d{4}<', f'/films/year/{year}/">{year}<', site.film_page)
+                return self.send_body(200, html, "text/html; charset=utf-8")
+            if path.endswith("/list_movies.json") and "query_term" not in query:
+                page, limit = int(query.get("page", ["1"])[0]), int(query.get("limit", ["20"])[0])
+                return self.send_body(200, json.dumps(site.yts_listing(page, limit, host)), "application/json")
+            if path.endswith("/list_movies.json"):
+                return self.send_body(200, json.dumps(site.yts_search(query.get("query_term", [""])[0], host)), "application/json")
+            if path.endswith("/movie_details.json"):
+                return self.send_body(200, json.dumps(site.yts_details(int(query.get("movie_id", ["0"])[0]), host)), "application/json")
+            if path.startswith("/torrent/download/"):
+                return self.send_body(200, TORRENT_BODY, "application/x-bittorrent")
+            if path.startswith("/search/"):
+                return self.send_body(200, site.fan_search(re.findall(r"fan:([^+/]+)", path)), "text/html; charset=utf-8")
+            self.send_body(404, "Not found", "text/plain")
+
+    return Handler
+
+
+def serve(port=0, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, error_status=503, retry_after=None, rated_pages=20, watchlist_pages=5, seed=1, yts_catalog=1000):
+    """Starts the stub on a background thread and returns the server; port 0 picks a free port."""
+    site = StubSite(rated_pages, watchlist_pages, yts_catalog)
+    handler = make_handler(site, latency_ms / 1000, jitter_ms / 1000, error_status, retry_after, seed)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.error_rate = error_rate
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the benchmark fixtures as a local Letterboxd/YTS stand-in.")
+    parser.add_argument("--port", type=int, default=0, help="Port to listen on (default: any free port).")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to every response.")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Random +/- variation of the delay.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with --error-status.")
+    parser.add_argument("--error-status", type=int, default=503, help="Status code of injected errors (e.g. 429, 500, 503).")
+    parser.add_argument("--retry-after", type=int, help="Retry-After seconds sent with injected errors.")
+    parser.add_argument("--rated-pages", type=int, default=20, help="Pages of 5-star ratings (and of all ratings) per user.")
+    parser.add_argument("--watchlist-pages", type=int, default=5, help="Pages of watchlist per user.")
+    parser.add_argument("--yts-catalog", type=int, default=1000, help="Filler movies in the YTS date_added listing, besides the watchlist films.")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for latency jitter and error injection.")
+    args = parser.parse_args()
+    server = serve(args.port, args.latency_ms, args.jitter_ms, args.error_rate, args.error_status, args.retry_after,
+                   args.rated_pages, args.watchlist_pages, args.seed, args.yts_catalog)
+    print(f"READY {server.server_address[1]}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
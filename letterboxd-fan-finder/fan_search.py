@@ -0,0 +1,159 @@
+"""Runs Letterboxd `fan:` searches and ranks the members they return.
+
+A member listed by the search for a combination of films is a fan of every
+film in it (a `fan:` search matches the four favourite films on a profile, so
+combinations of more than four films are never searched), so the member lists from all combination searches are merged into
+one ranking by how many of the chosen films each member is a fan of. Searches
+run concurrently over one pooled, cached session; set LETTERBOXD_BASE_URL to
+point them at a local stub.
+"""
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from itertools import combinations, islice
+from math import comb
+
+from letterboxd_common.http_cache import CachedSession
+from letterboxd_common.metrics import METRICS
+from title_index import slugify
+
+LETTERBOXD_BASE_URL = os.environ.get("LETTERBOXD_BASE_URL", "https://letterboxd.com").rstrip("/")
+MAX_WORKERS = 8
+# Members list four favourite films, so a combination of more titles matches nobody
+MAX_FAVOURITES = 4
+# 12 titles' worth; with more titles the largest combinations are left out
+MAX_SEARCHES = 1023
+# Live Letterboxd searches the web apps may start per request (every combination of up to 4 of 6 titles), since anyone who can reach them can send one
+SERVER_MAX_SEARCHES = int(os.environ.get("FAN_FINDER_MAX_SEARCHES", 63))
+# Most titles the web apps take at once (6,195 combinations to page through)
+MAX_TITLES = 20
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+MEMBER_HREF = re.compile(r"^/([A-Za-z0-9_]+)/$")
+
+
+def iter_combinations(items, max_size=MAX_FAVOURITES):
+    """Lazily yields every combination of one to max_size of the items, smallest first."""
+    for n in range(1, min(len(items), max_size) + 1):
+        yield from combinations(items, n)
+
+
+def count_combinations(items, max_size=MAX_FAVOURITES):
+    return sum(comb(len(items), n) for n in range(1, min(len(items), max_size) + 1))
+
+
+def combination_at(items, index, max_size=MAX_FAVOURITES):
+    """Returns the combination at position index of iter_combinations(items, max_size) without generating the ones before it."""
+    n = len(items)
+    for size in range(1, min(n, max_size) + 1):
+        if index >= comb(n, size):
+            index -= comb(n, size)
+            continue
+        combo, first = [], 0
+        for remaining in range(size, 0, -1):
+            # Skip past every combination starting with an earlier item
+            while index >= comb(n - first - 1, remaining - 1):
+                index -= comb(n - first - 1, remaining - 1)
+                first += 1
+            combo.append(items[first])
+            first += 1
+        return tuple(combo)
+    raise IndexError("combination index out of range")
+
+
+def max_titles(max_searches):
+    """Returns the most titles whose combinations all fit in max_searches searches."""
+    titles = 0
+    while count_combinations(range(titles + 1)) <= max_searches:
+        titles += 1
+    return titles
+
+
+def search_url(slugs, base_url=LETTERBOXD_BASE_URL):
+    """Returns the `fan:` search URL for members who are fans of all of the films."""
+    return f"{base_url}/search/{'+'.join(f'fan:{slug}' for slug in slugs)}/"
+
+
+class MemberResultsParser(HTMLParser):
+    """Collects (username, display name) from the member entries of a search results page."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.members = {}
+        self.result_depth = 0
+        self.username = None
+        self.name_text = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+        if tag == "li" and "search-result" in classes:
+            self.result_depth = 1
+        elif self.result_depth:
+            if tag == "li":
+                self.result_depth += 1
+            elif tag == "a":
+                match = MEMBER_HREF.match(attrs.get("href") or "")
+                if match:
+                    self.username = match.group(1)
+                    self.members.setdefault(self.username, self.username)
+                    self.name_text = []
+
+    def handle_endtag(self, tag):
+        if not self.result_depth:
+            return
+        if tag == "a" and self.name_text is not None:
+            name = " ".join("".join(self.name_text).split())
+            if name:
+                self.members[self.username] = name
+            self.name_text = None
+        elif tag == "li":
+            self.result_depth -= 1
+
+    def handle_data(self, data):
+        if self.name_text is not None:
+            self.name_text.append(data)
+
+
+def parse_members(html):
+    """Returns {username: display name} for the members listed on a search results page, in page order."""
+    if isinstance(html, bytes):
+        html = html.decode("utf-8", errors="replace")
+    parser = MemberResultsParser()
+    parser.feed(html)
+    parser.close()
+    return parser.members
+
+
+def search_fans(slugs, session, base_url=LETTERBOXD_BASE_URL):
+    """Runs one combination search and returns its members; failed searches return no members."""
+    url = search_url(slugs, base_url)
+    try:
+        response = session.get(url, headers=HEADERS, timeout=10)
+        response.raise_for_status()
+    except Exception as e:
+        print(f"Error fetching {url}: {e}")
+        return {}
+    with METRICS.timer("parse_seconds", page="fan_search"):
+        return parse_members(response.content)
+
+
+def rank_fans(results):
+    """Merges (titles, members) search results into members ranked by how many of the titles they are fans of."""
+    fans = {}
+    for titles, members in results:
+        for username, name in members.items():
+            fan = fans.setdefault(username, {"username": username, "name": name, "films": set()})
+            fan["films"].update(titles)
+    ranked = sorted(fans.values(), key=lambda fan: (-len(fan["films"]), fan["username"].lower()))
+    return [dict(fan, films=sorted(fan["films"]), count=len(fan["films"]), url=f"https://letterboxd.com/{fan['username']}/") for fan in ranked]
+
+
+def find_fans(movie_titles, session=None, max_workers=MAX_WORKERS, base_url=LETTERBOXD_BASE_URL, max_searches=MAX_SEARCHES, title_index=None):
+    """Searches the combinations of the titles concurrently, smallest first and at most max_searches, and returns the ranked fans."""
+    session = session or CachedSession(pool_maxsize=max_workers)
+    slugs = {title: title_index.slug_for(title) if title_index else slugify(title) for title in movie_titles}
+    searches = list(islice(iter_combinations(movie_titles), max_searches))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        members = executor.map(lambda pair: search_fans([slugs[title] for title in pair], session, base_url), searches)
+        return rank_fans(zip(searches, members))
@@ -1,9 +1,19 @@
-from flask import Flask, render_template_string, request
-import urllib.parse
-from itertools import combinations
+from flask import Flask, jsonify, request
 import webbrowser
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # for letterboxd_common
+from letterboxd_common.http_cache import CachedSession
+from fan_search import MAX_TITLES, MAX_WORKERS, SERVER_MAX_SEARCHES, combination_at, count_combinations, find_fans, max_titles
+from title_index import DEFAULT_TITLES_PATH, TitleIndex
 
 app = Flask(__name__)
+SESSION = CachedSession(pool_maxsize=MAX_WORKERS)
+TITLES = TitleIndex.load(DEFAULT_TITLES_PATH)
+PER_PAGE = 50
+MAX_PER_PAGE = 500
+MIN_FIELDS = 4
+MAX_TITLE_SETS = 50
 
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -83,18 +93,51 @@ HTML_TEMPLATE = """
         .result-button:hover {
             background-color: #024ea2;
         }
+        .fans table {
+            width: 100%;
+            border-collapse: collapse;
+        }
+        .fans td, .fans th {
+            padding: 8px;
+            border-bottom: 1px solid #eee;
+            text-align: left;
+        }
     </style>
 </head>
 <body>
     <div class="container">
         <h1>Letterboxd Fan Finder</h1>
-        <p>Enter up to 4 movie titles to find Letterboxd users who love these movies:</p>
+        <p>Enter movie titles to find Letterboxd users who love these movies (a new box appears after each search):</p>
         <form method="post">
-            {% for i in range(1, 5) %}
-                <input type="text" name="movie{{ i }}" placeholder="Movie {{ i }}" value="{{ movie_titles[i-1] if i-1 < movie_titles|length else '' }}">
+            {% for i in range(1, field_count + 1) %}
+                <input type="text" name="movie{{ i }}" list="titles" autocomplete="off" placeholder="Movie {{ i }}" value="{{ movie_titles[i-1] if i-1 < movie_titles|length else '' }}">
             {% endfor %}
+            <datalist id="titles"></datalist>
             <button type="submit">Find Fans</button>
+            <button type="submit" name="action" value="rank">Rank Fans</button>
         </form>
+        {% if fans is not none %}
+        <div class="results fans">
+            <h2>Fans Ranked</h2>
+            {% if searched < total %}
+            <p>Ranked from the first {{ searched }} of {{ total }} searches, smallest combinations first. Enter at most {{ max_titles }} titles to run them all.</p>
+            {% endif %}
+            {% if fans %}
+            <table>
+                <tr><th>Member</th><th>Fan of</th><th>Films</th></tr>
+                {% for fan in fans %}
+                    <tr>
+                        <td><a href="{{ fan.url }}" target="_blank">{{ fan.name }}</a></td>
+                        <td>{{ fan.count }}/{{ movie_titles|length }}</td>
+                        <td>{{ fan.films|join(", ") }}</td>
+                    </tr>
+                {% endfor %}
+            </table>
+            {% else %}
+            <p>No fans found.</p>
+            {% endif %}
+        </div>
+        {% endif %}
         {% if links %}
         <div class="results">
             <h2>Search Results</h2>
@@ -107,15 +150,47 @@ HTML_TEMPLATE = """
                     </li>
                 {% endfor %}
             </ul>
+            {% if pages > 1 %}
+            <form method="post">
+                {% for title in movie_titles %}
+                    <input type="hidden" name="movie{{ loop.index }}" value="{{ title }}">
+                {% endfor %}
+                <p>Page {{ page }} of {{ pages }} ({{ total }} searches, smallest combinations first)</p>
+                {% if page > 1 %}
+                    <button type="submit" name="page" value="{{ page - 1 }}">Previous</button>
+                {% endif %}
+                {% if page < pages %}
+                    <button type="submit" name="page" value="{{ page + 1 }}">Next</button>
+                {% endif %}
+            </form>
+            {% endif %}
         </div>
         {% endif %}
     </div>
+    <script>
+        // Suggestions come from the server's title index, as "Title (Year)" so the year picks between remakes
+        const titles = document.getElementById("titles");
+        document.querySelectorAll("input[list=titles]").forEach((input) => {
+            input.addEventListener("input", async () => {
+                if (input.value.trim().length < 2) return;
+                const response = await fetch(`/api/autocomplete?q=${encodeURIComponent(input.value)}`);
+                const { results } = await response.json();
+                titles.replaceChildren(...results.map((film) => {
+                    const option = document.createElement("option");
+                    option.value = film.year ? `${film.title} (${film.year})` : film.title;
+                    return option;
+                }));
+            });
+        });
+    </script>
 </body>
 </html>
 """
+# Compiled once at import instead of being re-parsed by render_template_string on every request
+TEMPLATE = app.jinja_env.from_string(HTML_TEMPLATE)
 
 def to_slug(title: str) -> str:
-    return urllib.parse.quote(title.lower().replace(" ", "-"))
+    return TITLES.slug_for(title)
 
 def format_title(title: str) -> str:
     exceptions = {
@@ -130,27 +205,103 @@ def format_title(title: str) -> str:
         ]
     )
 
-def generate_links(movie_titles: list) -> list:
+def generate_links(movie_titles: list, page: int = 1, per_page: int = PER_PAGE) -> list:
+    """Returns one page of (search link, label) pairs, smallest combinations first, without building the pages before it."""
+    slugs = [f"fan:{to_slug(title)}" for title in movie_titles]
+    labels = [format_title(title) for title in movie_titles]
+    items = range(len(movie_titles))
+    start = (page - 1) * per_page
     links = []
-    for n in range(1, len(movie_titles) + 1):
-        for pair in combinations(movie_titles, n):
-            link = f"https://letterboxd.com/search/{'+'.join(f'fan:{to_slug(title)}' for title in pair)}/"
-            title = ", ".join(map(format_title, pair))
-            links.append((link, title))
+    for position in range(start, min(start + per_page, count_combinations(items))):
+        combo = combination_at(items, position)
+        link = f"https://letterboxd.com/search/{'+'.join(slugs[i] for i in combo)}/"
+        links.append((link, ", ".join(labels[i] for i in combo)))
     return links
 
+def clean_titles(titles) -> list:
+    """Strips titles and drops blanks and repeats, keeping the entered order."""
+    return list(dict.fromkeys(title.strip() for title in titles if title and title.strip()))
+
 def get_movie_titles(form_data) -> list:
-    return [form_data.get(f"movie{i}", "").strip() for i in range(1, 5) if form_data.get(f"movie{i}", "").strip()]
+    fields = sorted((int(key[5:]), key) for key in form_data if key.startswith("movie") and key[5:].isdigit())
+    return clean_titles(form_data.get(key, "") for _, key in fields)
+
+def page_count(total: int, per_page: int = PER_PAGE) -> int:
+    return max(-(-total // per_page), 1)
 
 @app.route("/", methods=["GET", "POST"])
 def index():
-    movie_titles = get_movie_titles(request.form)
+    movie_titles = get_movie_titles(request.form)[:MAX_TITLES]
+    field_count = min(max(MIN_FIELDS, len(movie_titles) + 1), MAX_TITLES)
 
     if not movie_titles:
-        return render_template_string(HTML_TEMPLATE, links=[], movie_titles=movie_titles)
+        return TEMPLATE.render(links=[], fans=None, movie_titles=movie_titles, field_count=field_count)
     
-    links = generate_links(movie_titles)
-    return render_template_string(HTML_TEMPLATE, links=links, movie_titles=movie_titles)
+    total = count_combinations(movie_titles)
+    pages = page_count(total)
+    page = min(max(request.form.get("page", 1, type=int), 1), pages)
+    links = generate_links(movie_titles, page)
+    fans = find_fans(movie_titles, SESSION, max_searches=SERVER_MAX_SEARCHES, title_index=TITLES) if request.form.get("action") == "rank" else None
+    return TEMPLATE.render(links=links, fans=fans, movie_titles=movie_titles, field_count=field_count, page=page, pages=pages, total=total,
+                           searched=min(total, SERVER_MAX_SEARCHES), max_titles=max_titles(SERVER_MAX_SEARCHES))
+
+@app.route("/api/fans", methods=["GET", "POST"])
+def api_fans():
+    """Runs every combination search server-side and returns the ranked fans, rejecting title sets over SERVER_MAX_SEARCHES."""
+    movie_titles = clean_titles(request.values.getlist("title")) or get_movie_titles(request.values)
+    if not movie_titles:
+        return jsonify({"error": "Provide at least one title, e.g. /api/fans?title=Heat&title=Ronin"}), 400
+    searches = count_combinations(movie_titles)
+    if searches > SERVER_MAX_SEARCHES:
+        return jsonify({"error": f"{len(movie_titles)} titles need {searches} searches, more than the {SERVER_MAX_SEARCHES} one request may run. "
+                                 f"Send at most {max_titles(SERVER_MAX_SEARCHES)} titles."}), 400
+    fans = find_fans(movie_titles, SESSION, max_searches=SERVER_MAX_SEARCHES, title_index=TITLES)
+    return jsonify({"titles": movie_titles, "searches": searches, "fans": fans})
+
+@app.route("/api/autocomplete")
+def api_autocomplete():
+    """Returns films from the title index whose title starts with ?q=."""
+    limit = min(max(request.args.get("limit", 10, type=int), 1), 50)
+    return jsonify({"query": request.args.get("q", ""), "results": TITLES.complete(request.args.get("q", ""), limit)})
+
+@app.route("/api/resolve")
+def api_resolve():
+    """Returns the canonical slug for ?title= (optionally "Title (Year)" or with &year=) and every film sharing that title."""
+    title = request.args.get("title", "").strip()
+    if not title:
+        return jsonify({"error": "Provide a title, e.g. /api/resolve?title=Dune&year=2021"}), 400
+    year = request.args.get("year", type=int)
+    entry, candidates = TITLES.resolve(title, year)
+    return jsonify({"title": title, "year": year, "found": entry is not None, "slug": TITLES.slug_for(title, year), "candidates": candidates})
+
+@app.route("/api/links", methods=["POST"])
+def api_links():
+    """Returns one page of search links for each of many title sets posted as JSON {"title_sets": [[...]], "page", "per_page"}."""
+    payload = request.get_json(silent=True) or {}
+    title_sets = payload.get("title_sets")
+    if not isinstance(title_sets, list) or not all(isinstance(titles, list) for titles in title_sets):
+        return jsonify({"error": "Expected a JSON body with \"title_sets\": a list of lists of titles."}), 400
+    if len(title_sets) > MAX_TITLE_SETS:
+        return jsonify({"error": f"Send at most {MAX_TITLE_SETS} title sets per request."}), 400
+    try:
+        page = max(int(payload.get("page", 1)), 1)
+        per_page = min(max(int(payload.get("per_page", PER_PAGE)), 1), MAX_PER_PAGE)
+    except (TypeError, ValueError):
+        return jsonify({"error": "page and per_page must be integers."}), 400
+
+    title_sets = [clean_titles(str(title) for title in titles) for titles in title_sets]
+    if any(len(titles) > MAX_TITLES for titles in title_sets):
+        return jsonify({"error": f"Send at most {MAX_TITLES} titles per set."}), 400
+
+    results = []
+    for titles in title_sets:
+        total = count_combinations(titles)
+        pages = page_count(total, per_page)
+        set_page = min(page, pages)
+        links = generate_links(titles, set_page, per_page) if titles else []
+        results.append({"titles": titles, "total": total, "page": set_page, "pages": pages,
+                        "links": [{"url": link, "title": title} for link, title in links]})
+    return jsonify({"results": results})
 
 if __name__ == "__main__":
     webbrowser.open("http://127.0.0.1:5000/") 
@@ -1,10 +1,37 @@
 import streamlit as st
-import urllib.parse
-from itertools import combinations
 import webbrowser
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # for letterboxd_common
+from letterboxd_common.http_cache import CachedSession
+from fan_search import MAX_TITLES, MAX_WORKERS, SERVER_MAX_SEARCHES, combination_at, count_combinations, find_fans, max_titles
+from title_index import DEFAULT_TITLES_PATH, TitleIndex
+
+PER_PAGE = 30
+
+@st.cache_resource
+def create_session():
+    """Creates one cached, pooled session shared by every visitor of this server process."""
+    return CachedSession(pool_maxsize=MAX_WORKERS)
+
+@st.cache_resource
+def get_title_index():
+    """Loads the title index once per server process."""
+    return TitleIndex.load(DEFAULT_TITLES_PATH)
 
 def to_slug(title):
-    return urllib.parse.quote(title.lower().replace(" ", "-"))
+    return get_title_index().slug_for(title)
+
+def show_title_matches(title):
+    """Shows which film a title resolves to, or the indexed titles starting with it."""
+    entry, candidates = get_title_index().resolve(title)
+    if entry:
+        others = [f"{film['title']} ({film['year']})" for film in candidates if film["slug"] != entry["slug"]]
+        note = f" · also: {', '.join(others)} (add the year to pick one)" if others else ""
+        st.caption(f"→ {entry['title']} ({entry['year']}) · fan:{entry['slug']}{note}")
+    else:
+        suggestions = [f"{film['title']} ({film['year']})" if film["year"] else film["title"] for film in get_title_index().complete(title, 5)]
+        st.caption(f"Did you mean: {', '.join(suggestions)}" if suggestions else f"Not in the title index · fan:{to_slug(title)}")
     
 def format_title(title):
     exceptions = {
@@ -19,13 +46,17 @@ def format_title(title):
         ]
     )
 
-def generate_links(movie_titles):
+def generate_links(movie_titles, page=1, per_page=PER_PAGE):
+    """Returns one page of (search link, label) pairs, smallest combinations first, without building the pages before it."""
+    slugs = [f"fan:{to_slug(title)}" for title in movie_titles]
+    labels = [format_title(title) for title in movie_titles]
+    items = range(len(movie_titles))
+    start = (page - 1) * per_page
     links = []
-    for n in range(1, len(movie_titles) + 1):
-        for pair in combinations(movie_titles, n):
-            link = f"https://letterboxd.com/search/{'+'.join(f'fan:{to_slug(title)}' for title in pair)}/"
-            title = ", ".join(map(format_title, pair))
-            links.append((link, title))
+    for position in range(start, min(start + per_page, count_combinations(items))):
+        combo = combination_at(items, position)
+        link = f"https://letterboxd.com/search/{'+'.join(slugs[i] for i in combo)}/"
+        links.append((link, ", ".join(labels[i] for i in combo)))
     return links
 
 def app():
@@ -33,33 +64,56 @@ def app():
     st.title("Letterboxd Fan Finder") 
 
     with st.container():
-        st.subheader("Enter up to 4 movie titles:")
+        st.subheader("Enter movie titles:")
+        field_count = st.number_input("Number of movies", min_value=1, max_value=MAX_TITLES, value=4, step=1, key="field_count")
         movie_titles = []
-        for i in range(1, 5):
+        for i in range(1, int(field_count) + 1):
             movie_title = st.text_input(f"Movie {i}", key=f"movie{i}", placeholder=f"Enter Movie {i}")
-            if movie_title.strip():
+            if movie_title.strip() and movie_title.strip() not in movie_titles:
+                show_title_matches(movie_title.strip())
                 movie_titles.append(movie_title.strip())
 
         submit_button = st.button("🔍 Find Fans", key="submit")
+        rank_fans = st.checkbox("Run the searches here and rank fans by how many of the movies they love", key="rank")
 
     if submit_button:
         if len(movie_titles) == 0:
             st.warning("Please enter at least one movie title to search.")
         else:
             with st.spinner("Searching for fans..."):
-                links = generate_links(movie_titles)
-                # Store results in session state to persist them
-                st.session_state.links = links
+                # Store the titles in session state to persist the results; links are built a page at a time
+                st.session_state.link_titles = movie_titles
+                st.session_state.fans = find_fans(movie_titles, create_session(), max_searches=SERVER_MAX_SEARCHES, title_index=get_title_index()) if rank_fans else None
+                st.session_state.fan_titles = movie_titles
+
+    if st.session_state.get('fans') is not None:
+        st.subheader("Fans Ranked:")
+        total = count_combinations(st.session_state.fan_titles)
+        if total > SERVER_MAX_SEARCHES:
+            st.caption(f"Ranked from the first {SERVER_MAX_SEARCHES} of {total} searches, smallest combinations first. Enter at most {max_titles(SERVER_MAX_SEARCHES)} movies to run them all.")
+        if st.session_state.fans:
+            st.dataframe(
+                [{"Member": fan["name"], "Fan of": f"{fan['count']}/{len(st.session_state.fan_titles)}", "Films": ", ".join(fan["films"]), "Profile": fan["url"]}
+                 for fan in st.session_state.fans],
+                column_config={"Profile": st.column_config.LinkColumn("Profile")},
+                hide_index=True,
+                use_container_width=True,
+            )
+        else:
+            st.info("No fans found.")
 
-    if 'links' in st.session_state:
-        if st.session_state.links:
-            st.subheader("Search Results:")
-            # Use columns for a grid display of results
-            cols = st.columns(3) 
-            for idx, (link, title) in enumerate(st.session_state.links):
-                col = cols[idx % 3] 
-                with col:
-                    st.button(title, key=link, on_click=lambda url=link: webbrowser.open(url))
+    if st.session_state.get('link_titles'):
+        titles = st.session_state.link_titles
+        total = count_combinations(titles)
+        pages = -(-total // PER_PAGE)
+        st.subheader("Search Results:")
+        page = st.number_input(f"Page (of {pages}, {total} searches, smallest combinations first)", min_value=1, max_value=pages, value=1, step=1) if pages > 1 else 1
+        # Use columns for a grid display of results
+        cols = st.columns(3) 
+        for idx, (link, title) in enumerate(generate_links(titles, int(page))):
+            col = cols[idx % 3] 
+            with col:
+                st.button(title, key=link, on_click=lambda url=link: webbrowser.open(url))
 
 if __name__ == "__main__":
     app()
@@ -0,0 +1,173 @@
+"""In-memory prefix index of film titles for autocomplete and slug resolution.
+
+Entries are (title, year, canonical Letterboxd slug), stored on disk as a
+gzipped TSV sorted by normalized title, so loading is one read and a split per
+line. Prefix queries bisect into the sorted keys and scan forward only over the
+matches. Titles starting with an article are also indexed without it, so "godf"
+finds "The Godfather". In memory the entries are held column by column (see
+film_records.FilmColumns), so a catalog-sized index costs a few pointers and a
+2-byte year per entry rather than a tuple and an int object each.
+
+The title list is built from the film catalog the scrapers share (or a CSV with
+title, year and slug columns):
+
+    python3 title_index.py --catalog ~/.cache/letterboxd-scratchpad/films.sqlite3
+"""
+import argparse
+import csv
+import gzip
+import os
+import re
+import sqlite3
+import sys
+from bisect import bisect_left
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # for letterboxd_common
+from letterboxd_common.film_catalog import DEFAULT_CATALOG_PATH, normalize_title
+from letterboxd_common.film_records import FilmColumns
+from letterboxd_common.http_cache import DEFAULT_CACHE_DIR
+
+DEFAULT_TITLES_PATH = os.environ.get("FAN_FINDER_TITLES", os.path.join(DEFAULT_CACHE_DIR, "titles.tsv.gz"))
+ARTICLES = ("the ", "a ", "an ")
+ENTRY_SCHEMA = {"title": "string", "year": "int16", "slug": "string"}
+YEAR_SUFFIX = re.compile(r"^(?P<title>.*?)\s*\((?P<year>\d{4})\)\s*$")
+
+
+def slugify(title):
+    """Best guess at a Letterboxd slug for a title that is not in the index."""
+    return normalize_title(title.replace("'", "").replace("’", "")).replace(" ", "-")
+
+
+def split_year(title, year=None):
+    """Splits "Title (1982)" into ("Title", 1982); an explicit year wins over one in the title."""
+    match = YEAR_SUFFIX.match(title)
+    if match:
+        return match.group("title"), year or int(match.group("year"))
+    return title, year
+
+
+def index_keys(title):
+    key = normalize_title(title)
+    keys = [key]
+    for article in ARTICLES:
+        if key.startswith(article) and len(key) > len(article):
+            keys.append(key[len(article):])
+    return keys
+
+
+class TitleIndex:
+    """Sorted keys and matching (title, year, slug) entry columns answering prefix and exact-title queries with bisect."""
+
+    def __init__(self, entries=()):
+        rows = sorted(((key, title, year, slug) for title, year, slug in entries for key in index_keys(title)),
+                      key=lambda row: (row[0], row[1], row[2] or 0, row[3]))
+        self.keys = [row[0] for row in rows]
+        self.entries = FilmColumns(ENTRY_SCHEMA)
+        for row in rows:
+            self.entries.append(row[1:])
+
+    def __len__(self):
+        return len(set(self.entries.column("slug")))
+
+    @classmethod
+    def load(cls, path=DEFAULT_TITLES_PATH):
+        """Loads an index written by save(); a missing file gives an empty index."""
+        index = cls()
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as titles_file:
+                for line in titles_file:
+                    key, title, year, slug = line.rstrip("\n").split("\t")
+                    index.keys.append(key)
+                    index.entries.append((title, year, slug))  # An empty year is stored as missing
+        except FileNotFoundError:
+            pass
+        return index
+
+    def save(self, path=DEFAULT_TITLES_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with gzip.open(f"{path}.tmp", "wt", encoding="utf-8") as titles_file:
+            for position, key in enumerate(self.keys):
+                title, year, slug = self.entries.row(position)
+                titles_file.write(f"{key}\t{title}\t{year or ''}\t{slug}\n")
+        os.replace(f"{path}.tmp", path)
+
+    def complete(self, prefix, limit=10):
+        """Returns up to `limit` {"title", "year", "slug"} dicts whose title starts with the prefix."""
+        prefix = normalize_title(prefix)
+        results, seen = [], set()
+        if not prefix:
+            return results
+        for position in range(bisect_left(self.keys, prefix), len(self.keys)):
+            if not self.keys[position].startswith(prefix) or len(results) >= limit:
+                break
+            title, year, slug = self.entries.row(position)
+            if slug not in seen:
+                seen.add(slug)
+                results.append({"title": title, "year": year, "slug": slug})
+        return results
+
+    def candidates(self, title):
+        """Returns every entry whose normalized title equals the title's, oldest first."""
+        key = normalize_title(title)
+        matches = {}
+        for position in range(bisect_left(self.keys, key), len(self.keys)):
+            if self.keys[position] != key:
+                break
+            title, year, slug = self.entries.row(position)
+            matches[slug] = {"title": title, "year": year, "slug": slug}
+        return sorted(matches.values(), key=lambda entry: (entry["year"] or 0, entry["slug"]))
+
+    def resolve(self, title, year=None):
+        """Returns (best entry or None, all entries with that title) for a title, optionally "Title (Year)" or with a year."""
+        title, year = split_year(title.strip(), year)
+        candidates = self.candidates(title)
+        if year:
+            for nearby_year in (year, year - 1, year + 1):
+                for entry in candidates:
+                    if entry["year"] == nearby_year:
+                        return entry, candidates
+            return None, candidates
+        # Letterboxd gives the bare slug to the first film with a title and suffixes later ones with their year
+        bare_slug = slugify(title)
+        best = next((entry for entry in candidates if entry["slug"] == bare_slug), candidates[0] if candidates else None)
+        return best, candidates
+
+    def slug_for(self, title, year=None):
+        """Returns the canonical slug for a title, falling back to slugify() for titles not in the index."""
+        entry, _ = self.resolve(title, year)
+        if entry:
+            return entry["slug"]
+        title, year = split_year(title.strip(), year)
+        return slugify(f"{title} {year}" if year else title)
+
+
+def read_catalog(path):
+    """Yields (title, year, slug) for every titled film in the shared film catalog."""
+    with sqlite3.connect(path) as db:
+        yield from db.execute("SELECT title, year, slug FROM films WHERE title IS NOT NULL")
+
+
+def read_titles_csv(path):
+    """Yields (title, year, slug) from a CSV with title, year and slug columns."""
+    with open(path, newline="", encoding="utf-8") as csv_file:
+        for row in csv.DictReader(csv_file):
+            year = row.get("year", "").strip()
+            yield row["title"], int(year) if year.isdigit() else None, row["slug"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the fan finder's title index from the film catalog and/or CSV files.")
+    parser.add_argument("--catalog", nargs="?", const=DEFAULT_CATALOG_PATH, help="SQLite film catalog filled by the other tools.")
+    parser.add_argument("--csv", action="append", default=[], help="CSV with title, year and slug columns (repeatable).")
+    parser.add_argument("-o", "--output", default=DEFAULT_TITLES_PATH, help="Where to write the index.")
+    args = parser.parse_args()
+    entries = {}
+    sources = ([read_catalog(args.catalog)] if args.catalog else []) + [read_titles_csv(path) for path in args.csv]
+    if not sources:
+        parser.error("Give --catalog and/or --csv.")
+    for source in sources:
+        for title, year, slug in source:
+            entries[slug] = (title, year, slug)
+    index = TitleIndex(entries.values())
+    index.save(args.output)
+    print(f"Indexed {len(entries)} films into {args.output}.")
@@ -0,0 +1,75 @@
+"""Overlap of film sets across any number of users.
+
+Film identities (titles, slugs, or any hashable key) are interned to small
+integers in order of first appearance, and each user's set is stored as a
+Python int used as a bitset. Intersections are then a single big-int AND and
+set sizes a popcount, which keeps the full pairwise matrix for hundreds of
+users with thousands of films each well under a second.
+"""
+
+
+def iter_bits(bitset):
+    """Yields the indexes of the set bits, lowest first."""
+    while bitset:
+        lowest = bitset & -bitset
+        yield lowest.bit_length() - 1
+        bitset ^= lowest
+
+
+class FilmOverlap:
+    """Interned film bitsets for a group of users."""
+
+    def __init__(self):
+        self.film_ids = {}
+        self.films = []
+        self.bitsets = {}
+
+    def intern(self, film):
+        """Returns the integer id of a film key, assigning the next free id to new films."""
+        film_id = self.film_ids.get(film)
+        if film_id is None:
+            film_id = self.film_ids[film] = len(self.films)
+            self.films.append(film)
+        return film_id
+
+    def add_user(self, user, films):
+        """Stores a user's films, replacing any set previously stored for that user."""
+        film_ids = [self.intern(film) for film in films]
+        # Setting bits in a bytearray avoids re-allocating a growing big int for every film
+        bits = bytearray(max(film_ids, default=0) // 8 + 1)
+        for film_id in film_ids:
+            bits[film_id >> 3] |= 1 << (film_id & 7)
+        self.bitsets[user] = int.from_bytes(bits, "little")
+
+    def users(self):
+        return list(self.bitsets)
+
+    def mutual(self, users=None):
+        """Returns the films shared by every one of the users (all stored users by default), in first-seen order."""
+        users = self.users() if users is None else users
+        if not users:
+            return []
+        bitset = self.bitsets[users[0]]
+        for user in users[1:]:
+            bitset &= self.bitsets[user]
+        return [self.films[film_id] for film_id in iter_bits(bitset)]
+
+    def pairwise_counts(self, users=None):
+        """Returns an NxN matrix of shared-film counts; the diagonal holds each user's own count."""
+        bitsets = [self.bitsets[user] for user in (self.users() if users is None else users)]
+        sizes = [bitset.bit_count() for bitset in bitsets]
+        matrix = [[0] * len(bitsets) for _ in bitsets]
+        for i, first in enumerate(bitsets):
+            matrix[i][i] = sizes[i]
+            for j in range(i + 1, len(bitsets)):
+                matrix[i][j] = matrix[j][i] = (first & bitsets[j]).bit_count()
+        return matrix
+
+    def jaccard_matrix(self, users=None):
+        """Returns an NxN matrix of |A & B| / |A | B| similarities between the users' film sets."""
+        counts = self.pairwise_counts(users)
+        return [
+            [shared / (counts[i][i] + counts[j][j] - shared) if counts[i][i] + counts[j][j] - shared else 0.0
+             for j, shared in enumerate(row)]
+            for i, row in enumerate(counts)
+        ]
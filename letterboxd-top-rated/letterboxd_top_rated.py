@@ -1,15 +1,40 @@
 import requests
-from bs4 import BeautifulSoup
 import argparse
 import csv
 import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 from tqdm import tqdm
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # for letterboxd_common
+from letterboxd_common.checkpoint import Checkpoint
+from letterboxd_common.columnar import FORMATS, available, convert_csv, write_table
+from letterboxd_common.http_cache import DEFAULT_CACHE_DIR, CachedSession
+from letterboxd_common.metrics import METRICS
+from letterboxd_common.parse_pool import PARSE_POOL
+from letterboxd_common.film_catalog import DEFAULT_CATALOG_PATH, FilmCatalog, slug_from_link
+from film_overlap import FilmOverlap
+from letterboxd_common.film_records import FilmColumns, RatedFilm
+from letterboxd_common.poster_grid import BACKENDS, DEFAULT_BACKEND, extract_page
+from rating_vectors import RatingVectors, half_stars
+from rating_vectors import available as similarity_available
 
-def fetch_page(url, headers):
+# Overridable so the scraper can be pointed at a local stub, e.g. for benchmarks
+LETTERBOXD_BASE_URL = os.environ.get("LETTERBOXD_BASE_URL", "https://letterboxd.com").rstrip("/")
+FILM_SCHEMA = {"title": "string", "link": "string", "rating": "int8"}
+MUTUAL_SCHEMA = {"title": "string", "rating": "int8"}
+COMPATIBILITY_SCHEMA = {"user": "string", "other_user": "string", "mutual": "int32", "jaccard": "float64"}
+USER_FILMS_SCHEMA = {"user": "string", "title": "string", "link": "string", "rating": "int8"}
+SIMILARITY_SCHEMA = {"user": "string", "other_user": "string", "co_rated": "int32", "cosine": "float64", "pearson": "float64", "mean_abs_diff": "float64"}
+
+def create_session(concurrency, cache_dir=DEFAULT_CACHE_DIR, use_cache=True):
+    """Creates a cached session whose connection pool is sized for the concurrency limit."""
+    return CachedSession(cache_dir, enabled=use_cache, pool_maxsize=concurrency)
+
+def fetch_page(url, headers, session=requests):
     """Fetches a page and returns the HTML content if successful."""
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = session.get(url, headers=headers, timeout=10)
         if response.status_code == 200:
             return response.text
         print(f"Failed to fetch {url}. Status code: {response.status_code}")
@@ -17,49 +42,187 @@ def fetch_page(url, headers):
         print(f"Error fetching {url}: {e}")
     return None
 
-def scrape_page(film_soup):
-    """Extracts film details from a single BeautifulSoup object."""
+def scrape_page(posters):
+    """Extracts 5-star film details from the posters of a single page."""
     films = []
-    for film in film_soup.select('li.poster-container'):
-        title = film.find('img')['alt'] if film.find('img') else "Unknown"
-        link_tag = film.find('a')
-        link = f"https://letterboxd.com{link_tag['href']}" if link_tag and 'href' in link_tag.attrs else "Unknown"
-        rating_tag = film.find('span', class_='rating')
+    for poster in posters:
+        title = poster['title'] if poster['title'] is not None else "Unknown"
 
         rating = None
-        if rating_tag:
-            rating_stars = rating_tag.text.strip()
-            rating = rating_stars.count('★')  # Convert '★★★★★' to the number of stars
+        if poster['rating'] is not None:
+            rating = poster['rating'].count('★')  # Convert '★★★★★' to the number of stars
         
         if rating == 5:  # Only keep films rated exactly 5
-            films.append({'title': title, 'link': link, 'rating': rating})
+            films.append(RatedFilm(title, poster['href'], rating))  # The link is built from the href when read
     
     return films
 
-def scrape_letterboxd(user):
-    """Scrapes films rated exactly 5 stars from all pages of Letterboxd."""
-    base_url = f"https://letterboxd.com/{user}/films/rated/5/page/"
+def scrape_ratings_page(posters):
+    """Extracts every rated film of a single ratings page, with its rating in half stars (1 = ½ to 10 = ★★★★★)."""
+    films = []
+    for poster in posters:
+        rating = half_stars(poster['rating'])
+        if rating and poster['href']:
+            films.append(RatedFilm(poster['title'] if poster['title'] is not None else "Unknown", poster['href'], rating))
+    return films
+
+def parse_grid_page(page_content, scrape, backend=None):
+    """Returns (films, page count) for a grid page; runs in a parse process when --parse-workers is set."""
+    posters, page_count = extract_page(page_content, backend)
+    return scrape(posters), page_count
+
+def iter_rated_pages(user, concurrency=1, session=None, backend=None, start_page=1):
+    """Yields (page, films) for each page of the user's 5-star films; see iter_grid_pages."""
+    return iter_grid_pages(f"{LETTERBOXD_BASE_URL}/{user}/films/rated/5/page/", scrape_page, concurrency, session, backend, start_page)
+
+def iter_ratings_pages(user, concurrency=1, session=None, backend=None):
+    """Yields (page, films) for each page of all the user's rated films, half stars included; see iter_grid_pages."""
+    return iter_grid_pages(f"{LETTERBOXD_BASE_URL}/{user}/films/ratings/page/", scrape_ratings_page, concurrency, session, backend, kind="ratings")
+
+def iter_grid_pages(base_url, scrape, concurrency=1, session=None, backend=None, start_page=1, kind="rated"):
+    """Yields (page, films) for each grid page under base_url in page order; a failed fetch is yielded as (page, None) and ends it."""
+    session = session or create_session(concurrency)
     headers = {'User-Agent': 'Mozilla/5.0'}
+
+    first_page = fetch_page(f"{base_url}{start_page}/", headers, session)
+    if not first_page:
+        yield start_page, None
+        return
+    with METRICS.timer("parse_seconds", page=kind):
+        films, page_count = PARSE_POOL.run(parse_grid_page, first_page, scrape, backend)
+    if not films:  # Past the end of pagination, e.g. when resuming a finished run
+        return
+    yield start_page, films
+    pages = range(start_page + 1, page_count + 1)
+
+    def fetch_films(page):
+        page_content = fetch_page(f"{base_url}{page}/", headers, session)
+        if not page_content:
+            return None
+        with METRICS.timer("parse_seconds", page=kind):
+            return PARSE_POOL.run(parse_grid_page, page_content, scrape, backend)[0]
+
+    # executor.map yields results in page order
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        for page, films in zip(pages, executor.map(fetch_films, pages)):
+            yield page, films
+            if films is None:
+                return
+
+def collect_films(pages):
+    """Collects the films of every (page, films) pair, stopping at the first failed fetch."""
     films = []
-    page = 1
-    while True:
-        # Fetch the page
-        page_url = f"{base_url}{page}/"  # Construct the page URL
-        page_content = fetch_page(page_url, headers)
-        
-        if page_content:
-            soup = BeautifulSoup(page_content, 'html.parser')
-            page_films = scrape_page(soup)
-            if not page_films:  # If no films are found, break the loop (end of pagination)
-                print(f"No more films on page {page}. Ending scraping.")
+    for page, page_films in pages:
+        if page_films is None:
+            print(f"Stopping at page {page} after a failed fetch; the films are incomplete.")
+            break
+        films.extend(page_films)
+    return films
+
+def scrape_letterboxd(user, concurrency=1, session=None, backend=None):
+    """Scrapes films rated exactly 5 stars from all pages of Letterboxd."""
+    return collect_films(iter_rated_pages(user, concurrency, session, backend))
+
+def scrape_ratings(user, concurrency=1, session=None, backend=None):
+    """Scrapes every film the user rated, with ratings in half stars."""
+    return collect_films(iter_ratings_pages(user, concurrency, session, backend))
+
+def scrape_users(users, concurrency=1, session=None, backend=None, path="films/rated/5", scrape=scrape_page, kind="rated"):
+    """Scrapes the grid pages of many users through one shared pool of `concurrency` workers and returns {user: films}."""
+    session = session or create_session(concurrency)
+    headers = {'User-Agent': 'Mozilla/5.0'}
+    pages = {user: {} for user in users}
+    remaining = dict.fromkeys(users, 1)
+
+    def fetch(user, page):
+        page_content = fetch_page(f"{LETTERBOXD_BASE_URL}/{user}/{path}/page/{page}/", headers, session)
+        if not page_content:
+            return None, 0
+        with METRICS.timer("parse_seconds", page=kind):
+            films, page_count = PARSE_POOL.run(parse_grid_page, page_content, scrape, backend)
+        return films, page_count if page == 1 else 0
+
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor, tqdm(total=len(users), desc="Scraping users", unit="users") as pbar:
+        # Every user's first page is queued at once and their later pages join the same queue, so the pool never drains between users
+        pending = {executor.submit(fetch, user, 1): (user, 1) for user in users}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                user, page = pending.pop(future)
+                films, page_count = future.result()
+                pages[user][page] = films
+                if films and page_count > 1:
+                    remaining[user] += page_count - 1
+                    for next_page in range(2, page_count + 1):
+                        pending[executor.submit(fetch, user, next_page)] = (user, next_page)
+                remaining[user] -= 1
+                if not remaining[user]:
+                    pbar.update(1)
+
+    user_films = {}
+    for user in users:
+        user_films[user] = []
+        for page, films in sorted(pages[user].items()):
+            if films is None:
+                print(f"Stopping {user} at page {page} after a failed fetch; their films are incomplete.")
                 break
+            user_films[user].extend(films)
+    return user_films
 
-            films.extend(page_films)
-            page += 1  # Go to the next page
-        else:
-            break
+def read_users_file(filename):
+    """Reads one username per line, skipping blank lines and # comments."""
+    with open(filename, encoding='utf-8') as file:
+        return [line.split('#', 1)[0].strip() for line in file if line.split('#', 1)[0].strip()]
 
-    return films
+def users_label(users):
+    """Joins the usernames for output filenames, or counts them when the joined names would be too long."""
+    label = '_'.join(users)
+    return label if len(label) <= 100 else f"{len(users)}_users"
+
+def save_user_films(user, concurrency, session, catalog, backend=None, resume=False, output_format="csv"):
+    """Appends a user's 5-star films to a .part CSV page by page, checkpointing so an interrupted run can resume."""
+    checkpoint = Checkpoint(f".top-rated-{user}.checkpoint.json")
+    state = checkpoint.load() if resume else None
+    if state and state.get("user") == user and os.path.exists(f"{state['output']}.part"):
+        filename, start_page, mode, cursor = state["output"], state["last_page"] + 1, 'a', state.get("cursor")
+        print(f"Resuming {user} from page {start_page} into {filename}.")
+    else:
+        filename = f"user_5_star_films-{user}-{datetime.utcnow().strftime('%Y-%m-%d-%H-%M')}-utc.csv"
+        start_page, mode, cursor = 1, 'w', None
+        checkpoint.clear()
+
+    skip_through = cursor
+    with open(f"{filename}.part", mode=mode, newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=list(FILM_SCHEMA))
+        if mode == 'w':
+            writer.writeheader()
+        for page, films in iter_rated_pages(user, concurrency, session, backend, start_page):
+            if films is None:
+                print(f"Stopped at page {page} after a failed fetch. Run again with --resume to continue from there.")
+                return None
+            if skip_through:
+                # Films rated since the checkpoint push the last one written onto the resumed page; skip what is already saved
+                links = [film['link'] for film in films]
+                if skip_through in links:
+                    films = films[links.index(skip_through) + 1:]
+                skip_through = None
+            with METRICS.timer("stage_seconds", stage="write"):
+                writer.writerows(films)
+                file.flush()
+                record_films(catalog, films)
+                cursor = films[-1]['link'] if films else cursor
+                checkpoint.save(user=user, output=filename, last_page=page, cursor=cursor)
+
+    os.replace(f"{filename}.part", filename)
+    checkpoint.clear()
+    with METRICS.timer("stage_seconds", stage="convert"):
+        filename = convert_csv(filename, FILM_SCHEMA, output_format)
+    print(f"5-star films saved to {filename}.")
+    return filename
+
+def record_films(catalog, films):
+    """Adds scraped films to the shared film catalog, keyed by their Letterboxd slug."""
+    catalog.update_many((slug_from_link(film['link']), film['title'], None, None) for film in films)
 
 def read_csv_for_5_star_films(filename):
     """Reads a CSV file and returns films with a 5-star rating."""
@@ -72,61 +235,164 @@ def read_csv_for_5_star_films(filename):
                     films.append({'title': row['title'], 'link': row['link'], 'rating': row['rating']})
     return films
 
-def find_mutual_films(films_user1, films_user2):
-    """Finds mutual 5-star films between two users, comparing only title and rating."""
-    # Use sets of tuples (title, rating) for comparison
-    user1_titles_and_ratings = set((film['title'], film['rating']) for film in films_user1)  # No lowercase conversion
-    user2_titles_and_ratings = set((film['title'], film['rating']) for film in films_user2)
+def build_overlap(user_films, users):
+    """Interns every user's (title, rating) pairs into bitsets for N-way comparison."""
+    overlap = FilmOverlap()
+    for user in users:
+        overlap.add_user(user, ((film['title'], film['rating']) for film in user_films[user]))  # No lowercase conversion
+    return overlap
+
+def find_mutual_films(overlap, users):
+    """Finds the 5-star films shared by all of the users, comparing only title and rating."""
+    return [{'title': title, 'rating': rating} for title, rating in overlap.mutual(users)]
 
-    # Find mutual films by intersecting the sets
-    mutual_films = user1_titles_and_ratings & user2_titles_and_ratings
-    return [{'title': title, 'rating': rating} for title, rating in mutual_films]
+def save_compatibility_matrix(overlap, users, output_format="csv"):
+    """Saves the pairwise shared-film counts and Jaccard similarities between every pair of users."""
+    counts = overlap.pairwise_counts(users)
+    jaccard = overlap.jaccard_matrix(users)
+    rows = [{"user": user, "other_user": other_user, "mutual": counts[i][j], "jaccard": round(jaccard[i][j], 4)}
+            for i, user in enumerate(users) for j, other_user in enumerate(users) if i < j]
+    filename = f"compatibility_5_star_films_{users_label(users)}_{datetime.utcnow().strftime('%Y-%m-%d-%H-%M')}-utc.csv"
+    with METRICS.timer("stage_seconds", stage="write"):
+        filename = write_table(rows, filename, COMPATIBILITY_SCHEMA, output_format)
+    print(f"Pairwise compatibility saved to {filename}")
 
-def save_mutual_films(mutual_films, users):
-    """Saves the mutual 5-star films to a CSV file and displays mutual count."""
+def save_mutual_films(mutual_films, users, output_format="csv"):
+    """Saves the mutual 5-star films to a CSV (or Parquet/Arrow) file and displays mutual count."""
     if mutual_films:
         # Calculate mutual count
         mutual_count = len(mutual_films)
         print(f"Found {mutual_count} mutual 5-star films.")
 
-        filename = f"mutual_5_star_films_{'_'.join(users)}_{datetime.utcnow().strftime('%Y-%m-%d-%H-%M')}-utc.csv"
-        with open(filename, mode='w', newline='', encoding='utf-8') as file:
-            fieldnames = ["title", "rating"]
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-            writer.writeheader()
-            for film in mutual_films:
-                writer.writerow(film)
+        filename = f"mutual_5_star_films_{users_label(users)}_{datetime.utcnow().strftime('%Y-%m-%d-%H-%M')}-utc.csv"
+        with METRICS.timer("stage_seconds", stage="write"):
+            filename = write_table(mutual_films, filename, MUTUAL_SCHEMA, output_format)
         print(f"Mutual 5-star films saved to {filename}")
     else:
         print("No mutual 5-star films found.")
 
-def main(users):
-    """Main function to scrape, find mutual films, and save the 5-star films for the given users."""
-    user_films = {}
+def score_value(score):
+    return None if score != score else round(float(score), 4)  # NaN (undefined) is saved as an empty value
+
+def save_similarity(vectors, users, output_format="csv"):
+    """Saves every pair's co-rated film count and cosine, Pearson and mean-absolute-difference scores, and prints the closest pairs."""
+    with METRICS.timer("stage_seconds", stage="compare"):
+        scores = vectors.similarity(users)
+    rows = [{"user": user, "other_user": other_user, "co_rated": int(scores["co_rated"][i][j]),
+             "cosine": score_value(scores["cosine"][i][j]), "pearson": score_value(scores["pearson"][i][j]),
+             "mean_abs_diff": score_value(scores["mean_abs_diff"][i][j])}
+            for i, user in enumerate(users) for j, other_user in enumerate(users) if i < j]
+
+    ranked = sorted((row for row in rows if row["pearson"] is not None), key=lambda row: row["pearson"], reverse=True)
+    for row in ranked[:10]:
+        print(f"{row['user']} / {row['other_user']}: Pearson {row['pearson']:.2f}, cosine {row['cosine']:.2f}, "
+              f"{row['mean_abs_diff']:.2f} stars apart on average over {row['co_rated']} co-rated films")
 
-    # Scrape the 5-star films for each user and store them
+    filename = f"similarity_{users_label(users)}_{datetime.utcnow().strftime('%Y-%m-%d-%H-%M')}-utc.csv"
+    with METRICS.timer("stage_seconds", stage="write"):
+        filename = write_table(rows, filename, SIMILARITY_SCHEMA, output_format)
+    print(f"Pairwise rating similarity saved to {filename}")
+
+def save_all_user_films(user_films, users, prefix, output_format="csv"):
+    """Saves every user's films to one file with a user column, in user and page order."""
+    rows = FilmColumns(USER_FILMS_SCHEMA)
     for user in users:
-        print(f"Scraping films for user: {user}")
-        user_films[user] = scrape_letterboxd(user)
-
-    if len(users) == 1:
-        # If only one user is provided, save their 5-star films
-        filename = f"user_5_star_films-{users[0]}-{datetime.utcnow().strftime('%Y-%m-%d-%H-%M')}-utc.csv"
-        with open(filename, mode='w', newline='', encoding='utf-8') as file:
-            fieldnames = ["title", "link", "rating"]
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-            writer.writeheader()
-            for film in user_films[users[0]]:
-                writer.writerow(film)
-        print(f"5-star films saved to {filename}.")
-    
+        rows.extend(user_films[user], user=user)
+    filename = f"{prefix}-{users_label(users)}-{datetime.utcnow().strftime('%Y-%m-%d-%H-%M')}-utc.csv"
+    with METRICS.timer("stage_seconds", stage="write"):
+        filename = write_table(rows, filename, USER_FILMS_SCHEMA, output_format)
+    print(f"{len(rows)} films of {len(users)} users saved to {filename}")
+
+def compare_ratings(users, concurrency, session, catalog, backend=None, output_format="csv", batch=False):
+    """Scrapes every user's full ratings into rating vectors keyed by film slug and saves their pairwise similarity."""
+    user_films = scrape_users(users, concurrency, session, backend, "films/ratings", scrape_ratings_page, "ratings")
+    vectors = RatingVectors()
+    for user in users:
+        vectors.add_user(user, ((slug_from_link(film['link']), film['rating']) for film in user_films[user]))
+        with METRICS.timer("stage_seconds", stage="write"):
+            record_films(catalog, user_films[user])
+    if batch:
+        save_all_user_films(user_films, users, "user_ratings", output_format)
+    save_similarity(vectors, users, output_format)
+
+def main(users, concurrency=1, cache_dir=DEFAULT_CACHE_DIR, use_cache=True, catalog_path=DEFAULT_CATALOG_PATH, backend=DEFAULT_BACKEND,
+         resume=False, output_format="csv", similarity=False, batch=False):
+    """Main function to scrape, find mutual films, and save the 5-star films for the given users."""
+    session = create_session(concurrency, cache_dir, use_cache)
+    catalog = FilmCatalog(catalog_path)
+
+    if similarity:
+        # Score the users against each other on all their ratings rather than exact 5-star matches
+        compare_ratings(users, concurrency, session, catalog, backend, output_format, batch)
+
+    elif len(users) == 1:
+        # If only one user is provided, stream their 5-star films to CSV page by page
+        print(f"Scraping films for user: {users[0]}")
+        save_user_films(users[0], concurrency, session, catalog, backend, resume, output_format)
+
     elif len(users) > 1:
-        # If multiple users are provided, compare their films
-        mutual_films = find_mutual_films(user_films[users[0]], user_films[users[1]])
-        save_mutual_films(mutual_films, users)
+        # Scrape the 5-star films of all users through one shared pool and store them
+        print(f"Scraping films for {len(users)} users")
+        user_films = scrape_users(users, concurrency, session, backend)
+        with METRICS.timer("stage_seconds", stage="write"):
+            for user in users:
+                record_films(catalog, user_films[user])
+        if batch:
+            save_all_user_films(user_films, users, "user_5_star_films", output_format)
+
+        # If multiple users are provided, compare the films of all of them
+        with METRICS.timer("stage_seconds", stage="compare"):
+            overlap = build_overlap(user_films, users)
+            mutual_films = find_mutual_films(overlap, users)
+        save_mutual_films(mutual_films, users, output_format)
+        if len(users) > 2:
+            save_compatibility_matrix(overlap, users, output_format)
+
+    if use_cache:
+        print(session.summary())
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Compare and save mutual 5-star films for users on Letterboxd.")
-    parser.add_argument('-u', '--user', action='append', required=True, help="Letterboxd username(s) of the user(s).")
+    parser.add_argument('-u', '--user', action='append', default=[], help="Letterboxd username(s) of the user(s).")
+    parser.add_argument('--users-file', help="File with one username per line to scrape as one batch, in addition to any -u users.")
+    parser.add_argument('-c', '--concurrency', type=int, default=1, help="Fetch pages concurrently over up to N pooled connections.")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="Directory for the on-disk HTTP cache shared by the scrapers.")
+    parser.add_argument('--no-cache', action='store_true', help="Always download pages instead of using the HTTP cache.")
+    parser.add_argument('--catalog', default=DEFAULT_CATALOG_PATH, help="SQLite film catalog shared with the watchlist tool.")
+    parser.add_argument('--parser', choices=sorted(BACKENDS), default=DEFAULT_BACKEND, help="HTML extraction backend for poster-grid pages.")
+    parser.add_argument('--resume', action='store_true', help="Continue an interrupted single-user scrape from its last completed page.")
+    parser.add_argument('--format', choices=FORMATS, default="csv", help="Output file format; parquet and arrow need pyarrow.")
+    parser.add_argument('--similarity', action='store_true', help="Scrape every rating, half stars included, and score each pair of users over their co-rated films.")
+    parser.add_argument('--parse-workers', type=int, default=0, metavar='N',
+                        help="Parse pages in N worker processes so parsing scales with cores (default 0: parse in the fetch threads).")
+    parser.add_argument('--metrics', metavar='PREFIX', help="Record request, parse and write timings and save them to PREFIX.json and PREFIX.prom.")
+    parser.add_argument('--live-stats', action='store_true', help="Print a stats line every second while scraping.")
     args = parser.parse_args()
-    main(args.user)
+    if args.users_file:
+        if not os.path.exists(args.users_file):
+            parser.error(f"--users-file {args.users_file} does not exist.")
+        args.user = list(dict.fromkeys(args.user + read_users_file(args.users_file)))
+    if not args.user:
+        parser.error("give at least one user with -u or --users-file.")
+    if not available(args.format):
+        parser.error(f"--format {args.format} needs pyarrow (pip3 install pyarrow).")
+    if args.similarity and len(args.user) < 2:
+        parser.error("--similarity needs at least two users (-u).")
+    if args.similarity and not similarity_available():
+        parser.error("--similarity needs numpy (pip3 install numpy).")
+    if args.parse_workers < 0:
+        parser.error("--parse-workers must be 0 or more.")
+    if args.parse_workers:
+        PARSE_POOL.start(args.parse_workers)  # Before any thread is started
+    if args.metrics or args.live_stats:
+        METRICS.enable()
+    if args.live_stats:
+        METRICS.start_live(write=tqdm.write)
+    try:
+        main(args.user, args.concurrency, args.cache_dir, not args.no_cache, args.catalog, args.parser, args.resume, args.format, args.similarity,
+             bool(args.users_file))
+    finally:
+        PARSE_POOL.shutdown()
+        METRICS.stop_live()
+        if args.metrics:
+            METRICS.write(args.metrics)
@@ -0,0 +1,108 @@
+"""Full-spectrum rating vectors and taste similarity between any number of users.
+
+Each user's ratings are kept as two parallel NumPy arrays: interned film ids
+(int32) and ratings in half stars (int8, 1 = ½ through 10 = ★★★★★). Comparing
+a cohort builds one users x films matrix over the films at least two of them
+rated, and every pairwise statistic over co-rated films comes out of a few
+matrix products instead of a Python loop per pair:
+
+- cosine: sum(a*b) / sqrt(sum(a²) * sum(b²))
+- Pearson: the covariance over co-rated films divided by both standard deviations
+- mean absolute difference: |a - b| = a + b - 2*min(a, b), and for ratings
+  1..10 the sum of min(a, b) is the sum over k of [a >= k] * [b >= k]
+
+NumPy is only needed for this comparison; the rest of the tool works without it.
+"""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAX_HALF_STARS = 10
+
+
+def available():
+    """Returns whether NumPy is installed."""
+    return np is not None
+
+
+def half_stars(rating):
+    """Converts rating text such as '★★★½' to half stars (7); missing or empty ratings give None."""
+    if not rating:
+        return None
+    return rating.count("★") * 2 + ("½" in rating) or None
+
+
+class RatingVectors:
+    """Interned film ids and int8 half-star ratings for a group of users."""
+
+    def __init__(self):
+        self.film_ids = {}
+        self.films = []
+        self.ratings = {}
+
+    def intern(self, film):
+        """Returns the integer id of a film key, assigning the next free id to new films."""
+        film_id = self.film_ids.get(film)
+        if film_id is None:
+            film_id = self.film_ids[film] = len(self.films)
+            self.films.append(film)
+        return film_id
+
+    def add_user(self, user, ratings):
+        """Stores a user's (film, half_stars) pairs, replacing any ratings previously stored for that user.
+
+        Unrated films are skipped, and a film listed twice keeps its last rating.
+        """
+        by_id = {self.intern(film): rating for film, rating in ratings if rating}
+        self.ratings[user] = (np.fromiter(by_id.keys(), dtype=np.int32, count=len(by_id)),
+                              np.fromiter(by_id.values(), dtype=np.int8, count=len(by_id)))
+
+    def users(self):
+        return list(self.ratings)
+
+    def matrix(self, users=None):
+        """Returns the users x films int8 matrix (0 = unrated) over the films rated by at least two of the users, and those films' ids."""
+        users = self.users() if users is None else users
+        raters = np.zeros(len(self.films), dtype=np.int32)
+        for user in users:
+            raters[self.ratings[user][0]] += 1
+        shared = np.flatnonzero(raters >= 2)
+        columns = np.full(len(self.films), -1, dtype=np.int64)
+        columns[shared] = np.arange(len(shared))
+        matrix = np.zeros((len(users), len(shared)), dtype=np.int8)
+        for row, user in enumerate(users):
+            film_ids, ratings = self.ratings[user]
+            film_columns = columns[film_ids]
+            keep = film_columns >= 0
+            matrix[row, film_columns[keep]] = ratings[keep]
+        return matrix, shared
+
+    def similarity(self, users=None):
+        """Returns NxN arrays of co-rated film counts, cosine, Pearson and mean absolute difference in stars.
+
+        Every statistic only looks at the films both users rated. Pairs with no
+        co-rated films, or with a constant rating for Pearson, get NaN. The
+        diagonal only covers films that someone else in the group also rated.
+        """
+        matrix, _ = self.matrix(users)
+        # float32 products of these small integers are exact while the sums stay below 2**24; the divisions happen in float64
+        ratings = matrix.astype(np.float32)
+        rated = (matrix > 0).astype(np.float32)
+        co_rated = (rated @ rated.T).astype(np.float64)
+        dot = (ratings @ ratings.T).astype(np.float64)
+        sums = (ratings @ rated.T).astype(np.float64)  # sums[a, b]: a's ratings summed over the films b also rated
+        squares = ((ratings * ratings) @ rated.T).astype(np.float64)
+        min_sums = np.zeros_like(co_rated)
+        for threshold in range(1, MAX_HALF_STARS + 1):
+            at_least = (matrix >= threshold).astype(np.float32)
+            min_sums += at_least @ at_least.T
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cosine = dot / np.sqrt(squares * squares.T)
+            covariance = dot - sums * sums.T / co_rated
+            variance = np.maximum(squares - sums * sums / co_rated, 0)
+            pearson = covariance / np.sqrt(variance * variance.T)
+            mean_abs_diff = (sums + sums.T - 2 * min_sums) / co_rated / 2
+        pearson[~np.isfinite(pearson)] = np.nan
+        return {"co_rated": co_rated.astype(np.int64), "cosine": cosine, "pearson": pearson, "mean_abs_diff": mean_abs_diff}
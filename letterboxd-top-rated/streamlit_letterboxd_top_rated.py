@@ -1,52 +1,135 @@
 import requests
-from bs4 import BeautifulSoup
-import csv
+import os
 import pandas as pd
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import streamlit as st
-from io import StringIO
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # for letterboxd_common
+from letterboxd_common.columnar import available, with_extension
+from letterboxd_common.http_cache import CachedSession
+from letterboxd_common.film_catalog import FilmCatalog, slug_from_link
+from film_overlap import FilmOverlap
+from letterboxd_common.film_records import RatedFilm
+from letterboxd_common.poster_grid import extract_page, extract_posters
 
-def fetch_page(url, headers):
+# Overridable so the app can be pointed at a local stub, e.g. for benchmarks
+LETTERBOXD_BASE_URL = os.environ.get("LETTERBOXD_BASE_URL", "https://letterboxd.com").rstrip("/")
+# Seconds between re-renders of the growing film table while pages arrive
+RENDER_INTERVAL = 0.5
+
+@st.cache_resource
+def create_session(concurrency):
+    """Creates a cached session, shared by every browser session, sized for the concurrency limit."""
+    return CachedSession(pool_maxsize=concurrency)
+
+@st.cache_resource
+def get_catalog():
+    """Opens the film catalog shared with the other Letterboxd tools."""
+    return FilmCatalog()
+
+@st.cache_resource
+def get_results_cache():
+    """Per-user film lists shared by every browser session, as {user: (fetched_at, films)} plus its lock."""
+    return {}, threading.Lock()
+
+def create_executor(max_workers):
+    """Creates a thread pool whose workers can still report errors to the current Streamlit session."""
+    return ThreadPoolExecutor(max_workers=max_workers, initializer=add_script_run_ctx, initargs=(None, get_script_run_ctx()))
+
+def fetch_page(url, headers, session=requests):
     """Fetches a page and returns the HTML content if successful."""
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = session.get(url, headers=headers, timeout=10)
         response.raise_for_status()
         return response.text
     except requests.exceptions.RequestException as e:
         st.error(f"Error fetching {url}: {e}")
         return None
 
-def scrape_films(user, page_content):
-    """Extracts films rated exactly 5 stars from page content."""
-    soup = BeautifulSoup(page_content, 'html.parser')
+class ReviewedFilm(RatedFilm):
+    """A 5-star film whose link is read as the user's 'user_review' column."""
+
+    __slots__ = ()
+    COLUMNS = {'title': 'title', 'user_review': 'link', 'rating': 'rating'}
+
+def scrape_films(user, posters):
+    """Extracts films rated exactly 5 stars from a page's posters."""
     return [
-        {
-            'title': film.find('img')['alt'] if film.find('img') else "Unknown",
-            'user_review': f"https://letterboxd.com{film.find('a')['href']}" if film.find('a') else "Unknown",
-            'rating': 5
-        }
-        for film in soup.select('li.poster-container')
-        if film.find('span', class_='rating') and film.find('span', class_='rating').text.strip() == '★★★★★'
+        ReviewedFilm(poster['title'] if poster['title'] is not None else "Unknown", poster['href'], 5)
+        for poster in posters
+        if poster['rating'] == '★★★★★'
     ]
 
-def get_user_films(user):
-    """Fetches all 5-star films for the user."""
-    base_url = f"https://letterboxd.com/{user}/films/rated/5/page/"
+def iter_user_pages(user, concurrency, session):
+    """Yields (page, page_count, films) for each of the user's 5-star pages as it arrives; films is None for a failed page."""
+    base_url = f"{LETTERBOXD_BASE_URL}/{user}/films/rated/5/page/"
     headers = {'User-Agent': 'Mozilla/5.0'}
-    films = []
-    page = 1
 
-    while True:
-        page_content = fetch_page(f"{base_url}{page}/", headers)
-        if not page_content:
-            break
-        films_on_page = scrape_films(user, page_content)
-        if not films_on_page:
-            break
-        films.extend(films_on_page)
-        page += 1
+    first_page = fetch_page(f"{base_url}1/", headers, session)
+    if not first_page:
+        yield 1, 1, None
+        return
+    posters, page_count = extract_page(first_page)
+    yield 1, page_count, scrape_films(user, posters)
+    if page_count < 2:
+        return
+
+    with create_executor(concurrency) as executor:
+        futures = {executor.submit(fetch_page, f"{base_url}{page}/", headers, session): page for page in range(2, page_count + 1)}
+        for future in as_completed(futures):
+            page_content = future.result()
+            yield futures[future], page_count, scrape_films(user, extract_posters(page_content)) if page_content else None
+
+def films_in_page_order(pages):
+    """Joins {page: films} into one list in page order, leaving out failed pages."""
+    return [film for page in sorted(pages) if pages[page] for film in pages[page]]
+
+def record_films(films):
+    """Adds scraped films to the shared film catalog, keyed by their Letterboxd slug."""
+    get_catalog().update_many((slug_from_link(film['user_review']), film['title'], None, None) for film in films)
+
+def get_user_films(user, concurrency=1):
+    """Fetches all 5-star films for the user, in page order."""
+    pages = {page: films for page, _, films in iter_user_pages(user, concurrency, create_session(concurrency))}
+    return films_in_page_order(pages)
+
+def cached_user_films(user, ttl):
+    """Returns the cached (fetched_at, films) for the user if it is younger than ttl seconds, otherwise None."""
+    cache, lock = get_results_cache()
+    with lock:
+        entry = cache.get(user.lower())
+    return entry if entry and time.time() - entry[0] < ttl else None
+
+def remember_user_films(user, films, complete=True):
+    """Records fetched films in the catalog, and in the shared results cache when complete, and returns when they were fetched."""
+    fetched_at = time.time()
+    record_films(films)
+    if films and complete:  # An empty list usually means the fetch failed, so it is not worth keeping
+        cache, lock = get_results_cache()
+        with lock:
+            cache[user.lower()] = (fetched_at, films)
+    return fetched_at
+
+def stream_user_films(user, concurrency, session, events):
+    """Puts (user, page, page_count, films) on the events queue for every parsed page, then (user, None, None, None)."""
+    try:
+        for page, page_count, films in iter_user_pages(user, concurrency, session):
+            events.put((user, page, page_count, films))
+    finally:
+        events.put((user, None, None, None))
 
-    return films
+def format_age(seconds):
+    """Formats a duration in seconds as a short 'n units ago' phrase."""
+    if seconds < 60:
+        return "just now"
+    if seconds < 60 * 60:
+        return f"{int(seconds // 60)} min ago"
+    return f"{seconds / 3600:.1f} h ago"
 
 def find_mutual_films(films_dict, users):
     """Finds mutual films and includes both users' review links."""
@@ -57,65 +140,122 @@ def find_mutual_films(films_dict, users):
         mutual_films = [{'title': film['title'], f"{user1}_review": film['user_review'], 'rating': 5} for film in films_dict.get(user1, [])]
         return mutual_films
 
-    user1 = users[0]
-    user1_titles = {film['title'].strip() for film in films_dict.get(user1, [])}
+    # Index each user's review links by title once instead of scanning their films for every mutual title
+    reviews = {user: {} for user in users}
+    overlap = FilmOverlap()
+    for user in users:
+        for film in films_dict.get(user, []):
+            reviews[user].setdefault(film['title'].strip(), film['user_review'])
+        overlap.add_user(user, reviews[user])
 
-    mutual_titles = user1_titles  # Initialize mutual_titles with the first user's films
-
-    # Loop through other users and find mutual titles
-    for user in users[1:]:
-        user_titles = {film['title'].strip() for film in films_dict.get(user, [])}
-        mutual_titles &= user_titles
-
-    for title in mutual_titles:
+    for title in overlap.mutual(users):
         mutual_film = {'title': title, 'rating': 5}
         for user in users:
-            mutual_film[f"{user}_review"] = next(
-                (film['user_review'] for film in films_dict.get(user, []) if film['title'].strip() == title), None)
+            mutual_film[f"{user}_review"] = reviews[user][title]
         
         mutual_films.append(mutual_film)
     
     return mutual_films
 
+class LiveMutualFilms:
+    """The film table while pages are still arriving: a user's own films, or the titles every user has so far."""
+
+    def __init__(self, users):
+        self.users = users
+        self.reviews = {user: {} for user in users}
+        self.own_films = []
+        self.mutual_titles = []
+
+    def add(self, user, films):
+        if len(self.users) == 1:
+            self.own_films.extend(films)
+            return
+        reviews = self.reviews[user]
+        for film in films:
+            title = film['title'].strip()
+            if title in reviews:
+                continue
+            reviews[title] = film['user_review']
+            if all(title in self.reviews[other] for other in self.users):
+                self.mutual_titles.append(title)
+
+    def films(self):
+        if len(self.users) == 1:
+            return self.own_films
+        return [dict({'title': title, 'rating': 5}, **{f"{user}_review": self.reviews[user][title] for user in self.users})
+                for title in self.mutual_titles]
+
+def fetch_users_progressively(users, concurrency, ttl, table):
+    """Fetches the users' films concurrently, rendering progress and the film table as pages arrive; returns {user: (films, fetched_at, from_cache, failed_pages)}."""
+    progress = {user: st.progress(0.0, text=f"{user}: waiting for the first page") for user in users}
+    live = LiveMutualFilms(users)
+    results = {}
+
+    def show_done(user):
+        films, fetched_at, from_cache, failed_pages = results[user]
+        if failed_pages:
+            progress[user].progress(1.0, text=f"{user}: {len(films)} films, incomplete: {failed_pages} of {len(pages[user])} pages failed to load")
+            return
+        source = "from cache" if from_cache else "freshly fetched"
+        progress[user].progress(1.0, text=f"{user}: {len(films)} films, {source}, data from {format_age(time.time() - fetched_at)}")
+
+    for user in users:
+        entry = cached_user_films(user, ttl)
+        if entry:
+            fetched_at, films = entry
+            results[user] = (films, fetched_at, True, 0)
+            live.add(user, films)
+            show_done(user)
+
+    to_fetch = [user for user in users if user not in results]
+    session = create_session(concurrency)
+    events = queue.Queue()
+    pages = {user: {} for user in to_fetch}
+    rendered_at = 0.0
+    with create_executor(max(len(to_fetch), 1)) as executor:
+        workers = [executor.submit(stream_user_films, user, concurrency, session, events) for user in to_fetch]
+        running = len(workers)
+        while running:
+            user, page, page_count, films = events.get()
+            if page is None:
+                running -= 1
+                films = films_in_page_order(pages[user])
+                failed_pages = sum(page_films is None for page_films in pages[user].values())
+                results[user] = (films, remember_user_films(user, films, complete=not failed_pages), False, failed_pages)
+                show_done(user)
+                continue
+            pages[user][page] = films
+            if films:
+                live.add(user, films)
+            found = sum(len(page_films) for page_films in pages[user].values() if page_films)
+            progress[user].progress(len(pages[user]) / page_count, text=f"{user}: {len(pages[user])}/{page_count} pages, {found} films")
+            if time.monotonic() - rendered_at >= RENDER_INTERVAL:
+                rendered_at = time.monotonic()
+                table.dataframe(films_table(live.films(), users), use_container_width=True, height=600)
+        for worker in workers:
+            worker.result()  # Re-raise anything that went wrong on a worker thread
+    return results
+
+def films_table(films, users):
+    """Builds the typed film table column by column, reading the film records or dicts without modifying them."""
+    table = {"title": [film['title'] for film in films]}
+    for user in users:
+        # A single user's own films carry their review link as 'user_review'; mutual films have one column per user
+        review_key = 'user_review' if len(users) == 1 else f"{user}_review"
+        table[f"{user}_review"] = [film.get(review_key) or None for film in films]
+    table["rating"] = pd.array([int(film.get('rating', 5)) for film in films], dtype="int8")
+    return pd.DataFrame(table)
+
 def save_films_to_csv(films, filename, num_users, users):
-    """Saves films to CSV and provides download functionality."""
+    """Displays the films and offers them for download as CSV or, with pyarrow installed, Parquet."""
     if films:
-        # Define fieldnames dynamically based on the number of users
-        if num_users == 1:
-            fieldnames = ["title", f"{users[0]}_review", "rating"]
-        else:
-            fieldnames = ["title"] + [f"{user}_review" for user in users] + ["rating"]
+        df = films_table(films, users[:num_users])
+        st.dataframe(df, use_container_width=True, height=600)  # Display the table inline
 
-        for film in films:
-            # Rename or move 'user_review' to the correct user review key
-            if 'user_review' in film:
-                for i, user in enumerate(users):
-                    user_key = f"{user}_review"
-                    film[user_key] = film.pop('user_review', None)
-
-            for user in users:
-                user_key = f"{user}_review"
-                if user_key in film and (film[user_key] is None or film[user_key] == ""):
-                    del film[user_key] 
-
-            if 'rating' not in film:
-                film['rating'] = 5
-
-            # Remove any keys that are not in fieldnames to avoid the error
-            keys_to_remove = [key for key in film.keys() if key not in fieldnames]
-            for key in keys_to_remove:
-                film.pop(key)
-
-        output = StringIO()
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(films)
-
-        output.seek(0)
-        df = pd.read_csv(output)
-        st.dataframe(df, use_container_width=True, height=600)  # Display the CSV content inline
-
-        st.download_button("Download CSV", data=output.getvalue(), file_name=filename, mime="text/csv")
+        st.download_button("Download CSV", data=df.to_csv(index=False), file_name=filename, mime="text/csv")
+        if available("parquet"):
+            st.download_button("Download Parquet", data=df.to_parquet(index=False, compression="zstd"), file_name=with_extension(filename, "parquet"),
+                               mime="application/vnd.apache.parquet")
     else:
         st.write("No films found.")
 
@@ -123,6 +263,8 @@ def main():
     st.title("Letterboxd Top Ratings")
     user1_input = st.text_input("Enter the first Letterboxd username:", "")
     user2_input = st.text_input("Enter the second Letterboxd username (optional):", "")
+    concurrency = st.slider("Concurrent page requests per user:", min_value=1, max_value=16, value=4)
+    ttl_minutes = st.number_input("Reuse fetched results for (minutes):", min_value=0, max_value=24 * 60, value=60)
     
     if st.button("Search"):
         if user1_input:
@@ -131,15 +273,22 @@ def main():
             if user2_input:
                 users.append(user2_input.strip())
             
-            user_films = {user: get_user_films(user) for user in users}
-            
-            if len(users) == 2:
-                mutual_films = find_mutual_films(user_films, users)
-                filename = f"mutual_5_star_films_{'_'.join(users)}_{datetime.utcnow().strftime('%Y-%m-%d-%H-%M')}.csv"
-                save_films_to_csv(mutual_films, filename, len(users), users)
-            else:
-                filename = f"{users[0]}_5_star_films_{datetime.utcnow().strftime('%Y-%m-%d-%H-%M')}.csv"
-                save_films_to_csv(user_films[users[0]], filename, len(users), users)
+            # The table placeholder shows the films found so far and is replaced by the final table
+            table = st.empty()
+            results = fetch_users_progressively(users, concurrency, ttl_minutes * 60, table)
+            user_films = {user: films for user, (films, _, _, _) in results.items()}
+            incomplete = [user for user, (_, _, _, failed_pages) in results.items() if failed_pages]
+            if incomplete:
+                st.warning(f"Some pages could not be loaded for {', '.join(incomplete)}, so the results below are incomplete. Search again to retry them.")
+
+            with table.container():
+                if len(users) == 2:
+                    mutual_films = find_mutual_films(user_films, users)
+                    filename = f"mutual_5_star_films_{'_'.join(users)}_{datetime.utcnow().strftime('%Y-%m-%d-%H-%M')}.csv"
+                    save_films_to_csv(mutual_films, filename, len(users), users)
+                else:
+                    filename = f"{users[0]}_5_star_films_{datetime.utcnow().strftime('%Y-%m-%d-%H-%M')}.csv"
+                    save_films_to_csv(user_films[users[0]], filename, len(users), users)
 
 if __name__ == "__main__":
     main()
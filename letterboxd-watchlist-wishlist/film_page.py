@@ -0,0 +1,13 @@
+"""Field extraction for Letterboxd film pages.
+
+Kept out of the watchlist script so parse processes can import it cheaply.
+"""
+from bs4 import BeautifulSoup
+
+
+def extract_year(html):
+    """Returns the release year text from a film page's /films/year/ link, or "Unknown" when it is empty."""
+    soup = BeautifulSoup(html, "html.parser")
+    year = soup.select_one("a[href*='/films/year/']").text.strip() or "Unknown"
+    soup.decompose()  # Frees the page tree now rather than at the next cyclic garbage collection
+    return year
@@ -1,105 +1,240 @@
 import csv
 import random
-import time
 import os
 from datetime import datetime
 import argparse
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+from collections import deque
+from itertools import takewhile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 import requests
-from bs4 import BeautifulSoup
 from tqdm import tqdm
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # for letterboxd_common
+from letterboxd_common.checkpoint import Checkpoint
+from letterboxd_common.columnar import FORMATS, available, convert_csv, read_rows
+from letterboxd_common.http_cache import DEFAULT_CACHE_DIR, CachedSession
+from letterboxd_common.metrics import METRICS
+from letterboxd_common.parse_pool import PARSE_POOL
+from letterboxd_common.film_catalog import DEFAULT_CATALOG_PATH, FilmCatalog, normalize_title, slug_from_link
+from film_page import extract_year
+from letterboxd_common.film_records import WatchlistFilm
+from letterboxd_common.poster_grid import extract_page
+from yts_mirror import DEFAULT_MIRROR_PATH, YTSMirror
+from library_index import LibraryIndex
+from pipeline import Pipeline
+from singleflight import SingleFlight
 
-LETTERBOXD_BASE_URL = "https://letterboxd.com"
-YTS_API_URL = "https://yts.mx/api/v2/"
+LETTERBOXD_BASE_URL = os.environ.get("LETTERBOXD_BASE_URL", "https://letterboxd.com").rstrip("/")
+YTS_API_URL = os.environ.get("YTS_API_URL", "https://yts.mx/api/v2/")
 TORRENT_DIRECTORY = os.getcwd()
 EXISTING_MOVIES_DIRECTORY = os.getcwd() # Replace with actual directory
 DEFAULT_OUTPUT_DIR = "./torrents"
+# The per-host rate limiter decides how many requests actually run; this only caps the threads waiting for a slot
+MAX_WORKERS = 16
+# Per-stage worker counts for --stream; the bounded queues between stages apply backpressure
+LOOKUP_WORKERS = MAX_WORKERS
+MATCH_WORKERS = 8
+DOWNLOAD_WORKERS = 4
+WATCHLIST_SCHEMA = {"Name": "string", "Year": "int16", "Letterboxd URI": "string"}
+SESSION = CachedSession(pool_maxsize=MAX_WORKERS)
+CATALOG = FilmCatalog()
+YTS_MIRROR = None
+LIBRARY = LibraryIndex(EXISTING_MOVIES_DIRECTORY)
+# Identical YTS queries and film-page fetches share one in-flight request and are remembered for the run
+YTS_LOOKUPS = SingleFlight("yts")
+FILM_YEARS = SingleFlight("film_year")
+
+def load_movie_year(slug):
+    response = SESSION.get(f"{LETTERBOXD_BASE_URL}{slug}")
+    response.raise_for_status()
+    with METRICS.timer("parse_seconds", page="film"):
+        return PARSE_POOL.run(extract_year, response.content)
 
 def fetch_movie_year(slug):
+    """Returns the film's year from its page; a failed fetch raises requests.RequestException rather than guessing "Unknown"."""
     try:
-        return BeautifulSoup(requests.get(f"{LETTERBOXD_BASE_URL}{slug}").content, "html.parser").select_one("a[href*='/films/year/']").text.strip() or "Unknown"
+        return FILM_YEARS.do(slug, load_movie_year, slug)
     except requests.RequestException as e:
         print(f"Error fetching year for {slug}: {e}")
-        return "Unknown"
+        raise
+
+def get_poster_uri(poster):
+    return f"{LETTERBOXD_BASE_URL}{poster['target_link']}" if poster["target_link"] else None
 
-def extract_movie_data_from_poster(poster):
+def extract_movie_data_from_poster(poster, known_films):
     try:
-        slug = poster.select_one(".film-poster")["data-target-link"]
-        return {"Name": poster.find("img")["alt"], "Year": fetch_movie_year(slug), "Letterboxd URI": f"{LETTERBOXD_BASE_URL}{slug}"}
+        link, title = poster["target_link"], poster["title"]
+        if not link or title is None:
+            raise ValueError("poster is missing its film link or title")
+        film = known_films.get(slug_from_link(link))
+        if film and film["year"]:
+            year = film["year"]
+        else:
+            year = fetch_movie_year(link)
+            if year.isdigit():
+                CATALOG.update(slug_from_link(link), title=title, year=int(year))
+        return WatchlistFilm(title, year, f"{LETTERBOXD_BASE_URL}{link}")
+    except requests.RequestException:
+        raise
     except Exception as e:
         print(f"Error processing poster: {e}")
         return None
 
-def get_total_movies(user):
-    total_movies, page_number = 0, 1
+def iter_watchlist_pages(user, known_uris=frozenset(), start_page=1):
+    """Yields (page_number, posters, known_films, page_count) per watchlist page, stopping at the first film already in known_uris."""
+    page_number = start_page
     while True:
+        response = SESSION.get(f"{LETTERBOXD_BASE_URL}/{user}/watchlist/page/{page_number}/")
+        response.raise_for_status()
+        with METRICS.timer("parse_seconds", page="watchlist"):
+            posters, page_count = PARSE_POOL.run(extract_page, response.content)
+        new_posters = list(takewhile(lambda poster: get_poster_uri(poster) not in known_uris, posters))
+        if new_posters:
+            yield page_number, new_posters, CATALOG.get_many(slug_from_link(get_poster_uri(poster)) for poster in new_posters), page_count
+        if not posters or len(new_posters) < len(posters) or page_number >= page_count:
+            return
+        page_number += 1
+
+def scrape_watchlist(user, known_uris=frozenset(), start_page=1, on_page=None):
+    """Scrapes the watchlist in one pass, stopping at the first film already in known_uris; a failed fetch or lookup is raised."""
+    movies = []
+    pages = iter_watchlist_pages(user, known_uris, start_page)
+    unfinished = deque()  # [page_number, pending lookups, lookups in poster order, failed] per page, in page order
+    lookups = {}
+    failure = None
+    more_pages = True
+    stopped = False  # Set at the first page with a failed lookup; it and every later page are dropped
+    with ThreadPoolExecutor(max_workers=1) as page_fetcher, ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor, \
+            tqdm(desc=f"Scraping {user}'s watchlist", unit="movies") as pbar:
+        next_page = page_fetcher.submit(next, pages, None)
+        while next_page or unfinished:
+            done, _ = wait([*lookups, next_page] if next_page else list(lookups), return_when=FIRST_COMPLETED)
+            if next_page in done:
+                try:
+                    page = next_page.result()
+                except requests.RequestException as e:
+                    page, failure = None, e
+                next_page = None
+                if page and failure is None:
+                    page_number, posters, known_films, page_count = page
+                    if not pbar.total:
+                        # Estimated from the first page; corrected once the last page is seen
+                        pbar.total = len(posters) * (page_count - page_number + 1)
+                        pbar.refresh()
+                    entry = [page_number, set(), [], False]
+                    for poster in posters:
+                        future = executor.submit(extract_movie_data_from_poster, poster, known_films)
+                        entry[1].add(future)
+                        entry[2].append(future)
+                        lookups[future] = entry
+                    unfinished.append(entry)
+                else:
+                    more_pages = False
+
+            for future in done:
+                entry = lookups.pop(future, None)
+                if entry is None:
+                    continue
+                entry[1].discard(future)
+                try:
+                    movie_data = future.result()
+                except requests.RequestException as e:
+                    failure, more_pages, entry[3] = failure or e, False, True
+                    continue
+                if movie_data:
+                    pbar.update(1)
+
+            while unfinished and not unfinished[0][1]:
+                page_number, _, page_lookups, failed = unfinished.popleft()
+                if failed or stopped:
+                    stopped = True
+                    continue
+                # In poster order, so the resume cursor is the page's last film
+                page_movies = [movie for movie in (future.result() for future in page_lookups) if movie]
+                if on_page:
+                    on_page(page_number, page_movies)
+                else:
+                    movies.extend(page_movies)
+            # The next page is fetched while this one's lookups run, at most one page ahead of the oldest unfinished page
+            if more_pages and next_page is None and len(unfinished) < 2:
+                next_page = page_fetcher.submit(next, pages, None)
+        pbar.total = pbar.n
+        pbar.refresh()
+    if failure:
+        raise failure
+    return movies
+
+def save_watchlist(user, previous_movies=(), resume=False, output_format="csv"):
+    """Scrapes the watchlist into a .part CSV page by page, checkpointing for --resume, and returns the new movies (None if it stopped early)."""
+    known_uris = {movie["Letterboxd URI"] for movie in previous_movies}
+    checkpoint = Checkpoint(f".watchlist-{user}.checkpoint.json")
+    state = checkpoint.load() if resume else None
+    if state and state.get("user") == user and os.path.exists(f"{state['output']}.part"):
+        filename, start_page, mode, cursor = state["output"], state["last_page"] + 1, "a", state.get("cursor")
+        print(f"Resuming {user}'s watchlist from page {start_page} into {filename}.")
+    else:
+        filename = f"watchlist-{user}-{datetime.utcnow().strftime('%Y-%m-%d-%H-%M')}-utc.csv"
+        start_page, mode, cursor = 1, "w", None
+        checkpoint.clear()
+
+    with open(f"{filename}.part", mode=mode, newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=list(WATCHLIST_SCHEMA))
+        if mode == "w":
+            writer.writeheader()
+        skip_through = cursor
+
+        def save_page(page_number, movies):
+            nonlocal cursor, skip_through
+            if skip_through:
+                # Films added since the checkpoint push the last one written onto the resumed page; skip what is already saved
+                uris = [movie["Letterboxd URI"] for movie in movies]
+                if skip_through in uris:
+                    movies = movies[uris.index(skip_through) + 1:]
+                skip_through = None
+            with METRICS.timer("stage_seconds", stage="write"):
+                writer.writerows(movies)
+                file.flush()
+                cursor = movies[-1]["Letterboxd URI"] if movies else cursor
+                checkpoint.save(user=user, output=filename, last_page=page_number, cursor=cursor)
+
         try:
-            response = requests.get(f"https://letterboxd.com/{user}/watchlist/page/{page_number}/")
-            soup = BeautifulSoup(response.content, "html.parser")
-            posters = soup.select(".poster-container")
-            if not posters:
-                break
-            total_movies += len(posters)
-            if len(posters) < 20:
-                break
-            page_number += 1
+            scrape_watchlist(user, known_uris, start_page, save_page)
         except requests.RequestException as e:
-            print(f"Error fetching page {page_number}: {e}")
-            break
-    return total_movies
-
-def scrape_watchlist(user, total_movies):
-    movies, page_number = [], 1
-    with tqdm(total=total_movies, desc=f"Scraping {user}'s watchlist", unit="movies") as pbar:
-        while True:
-            try:
-                response = requests.get(f"https://letterboxd.com/{user}/watchlist/page/{page_number}/")
-                soup = BeautifulSoup(response.content, "html.parser")
-                posters = soup.select(".poster-container")
-                if not posters:
-                    break
-                with ThreadPoolExecutor(max_workers=10) as executor:
-                    future_to_poster = {executor.submit(extract_movie_data_from_poster, poster): poster for poster in posters}
-                    for future in as_completed(future_to_poster):
-                        movie_data = future.result()
-                        if movie_data:
-                            movies.append(movie_data)
-                            pbar.update(1)
-                time.sleep(1)
-                if len(posters) < 20:
-                    break
-                page_number += 1
-            except requests.RequestException as e:
-                print(f"Error fetching page {page_number}: {e}")
-                break
-    return movies
+            print(f"Stopped after a failed fetch: {e}. Run again with --resume to continue from the last completed page.")
+            return None
+        new_movies = read_csv(f"{filename}.part")
+        writer.writerows(previous_movies)
 
-def save_to_csv(movies, username):
-    if not movies:
-        print("No movies to save.")
-        return
-    filename = f"watchlist-{username}-{datetime.utcnow().strftime('%Y-%m-%d-%H-%M')}-utc.csv"
-    with open(filename, mode="w", newline="", encoding="utf-8") as file:
-        writer = csv.DictWriter(file, fieldnames=["Name", "Year", "Letterboxd URI"])
-        writer.writeheader()
-        writer.writerows(movies)
-    print(f"Saved {len(movies)} movies to {filename}.")
-    return filename
+    os.replace(f"{filename}.part", filename)
+    checkpoint.clear()
+    with METRICS.timer("stage_seconds", stage="convert"):
+        filename = convert_csv(filename, WATCHLIST_SCHEMA, output_format)
+    print(f"Saved {len(new_movies) + len(previous_movies)} movies ({len(new_movies)} new) to {filename}.")
+    return new_movies
 
 def read_csv(file_path):
-    with open(file_path, newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        return [{"Name": row["Name"], "Year": int(row["Year"]), "Letterboxd URI": row["Letterboxd URI"]} for row in reader]
+    """Reads a saved watchlist; CSV, Parquet and Arrow files are all accepted."""
+    movies = []
+    for row in read_rows(file_path):
+        year = int(row["Year"]) if isinstance(row["Year"], str) and row["Year"].isdigit() else row["Year"]
+        movies.append(WatchlistFilm(row["Name"], "Unknown" if year is None else year, row["Letterboxd URI"]))
+    return movies
+
+def query_yts(title):
+    """Returns the movies YTS lists for a search term, or None when it lists none."""
+    response = SESSION.get(f"{YTS_API_URL}list_movies.json", params={"query_term": title})
+    response.raise_for_status()
+    data = response.json()
+    return data["data"]["movies"] if "data" in data and "movies" in data["data"] else None
 
 def get_movie_data(title, year):
     try:
-        response = requests.get(f"{YTS_API_URL}list_movies.json", params={"query_term": title})
-        response.raise_for_status() 
-        data = response.json()
-
-        if "data" in data and "movies" in data["data"]:
+        # Searches differing only in case, accents, punctuation or spacing share one request
+        movies = YTS_LOOKUPS.do(("query", normalize_title(title)), query_yts, title)
+        if movies:
             return next(
-                (movie for movie in data["data"]["movies"]
+                (movie for movie in movies
                  if movie["title"].lower() == title.lower() and movie["year"] == year),
                 None
             )
@@ -112,6 +247,33 @@ def get_movie_data(title, year):
         print(f"Error parsing JSON response for {title} ({year}): {e}")
         return None
 
+def query_yts_movie(yts_id):
+    response = SESSION.get(f"{YTS_API_URL}movie_details.json", params={"movie_id": yts_id})
+    response.raise_for_status()
+    return response.json().get("data", {}).get("movie") or None
+
+def get_movie_data_by_id(yts_id):
+    try:
+        return YTS_LOOKUPS.do(("movie", yts_id), query_yts_movie, yts_id)
+    except (requests.RequestException, ValueError) as e:
+        print(f"Error fetching YTS movie {yts_id}: {e}")
+        return None
+
+def find_movie_data(movie):
+    """Looks the movie up on YTS (or the local mirror), going straight to the catalogued YTS id when one is known."""
+    slug = slug_from_link(movie["Letterboxd URI"])
+    film = CATALOG.get(slug) if slug else None
+    if film and film["yts_id"]:
+        return YTS_MIRROR.get(film["yts_id"]) if YTS_MIRROR else get_movie_data_by_id(film["yts_id"])
+
+    if YTS_MIRROR:
+        movie_data = YTS_MIRROR.match(movie["Name"], int(movie["Year"]))
+    else:
+        movie_data = get_movie_data(movie["Name"], int(movie["Year"]))
+    if movie_data and slug:
+        CATALOG.update(slug, title=movie["Name"], year=int(movie["Year"]), yts_id=movie_data["id"])
+    return movie_data
+
 def get_best_quality_torrent(torrents):
     return next((torrent for torrent in torrents if torrent["quality"] == "2160p"), next((torrent for torrent in torrents if torrent["quality"] == "1080p"), None))
 
@@ -125,11 +287,7 @@ def download_torrent(torrent_url, movie_title, movie_year, missing_files, output
         return
 
     # Check if the movie already exists in the existing directory
-    matched_dir = next(
-        (existing_dir for existing_dir in os.listdir(EXISTING_MOVIES_DIRECTORY)
-         if movie_title.lower() in existing_dir.lower() and os.path.isdir(os.path.join(EXISTING_MOVIES_DIRECTORY, existing_dir))),
-        None
-    )
+    matched_dir = LIBRARY.find(movie_title, movie_year)
 
     if matched_dir:
         print(f"Skipping {movie_title} ({movie_year}) since '{matched_dir}' already exists.")
@@ -138,10 +296,10 @@ def download_torrent(torrent_url, movie_title, movie_year, missing_files, output
 
     try:
         print(f"Downloading torrent for {movie_title} ({movie_year})...")
-        response = requests.get(torrent_url, stream=True)
+        response = SESSION.get(torrent_url, stream=True)
         response.raise_for_status()
 
-        with open(torrent_file_path, "wb") as torrent_file:
+        with METRICS.timer("stage_seconds", stage="download"), open(torrent_file_path, "wb") as torrent_file:
             for chunk in response.iter_content(chunk_size=8192):
                 torrent_file.write(chunk)
         print(f"Downloaded {movie_title} ({movie_year}) torrent to {output_dir}.")
@@ -150,6 +308,15 @@ def download_torrent(torrent_url, movie_title, movie_year, missing_files, output
         print(f"Error downloading {movie_title} ({movie_year}): {str(e)}")
         missing_files.append({"title": movie_title, "year": movie_year, "error": str(e)})
 
+def dedupe_movies(movies):
+    """Drops repeated rows (same title, ignoring case, accents, punctuation and spacing, and year), keeping the first of each."""
+    unique = {}
+    for movie in movies:
+        unique.setdefault((normalize_title(movie["Name"]), str(movie["Year"])), movie)
+    if len(unique) < len(movies):
+        print(f"Skipping {len(movies) - len(unique)} duplicate rows.")
+    return list(unique.values())
+
 def get_watchlist(args):
     """Reads or scrapes the watchlist based on arguments."""
     if args.file:
@@ -164,28 +331,39 @@ def get_watchlist(args):
         if os.path.exists(watchlist_file):
             print(f"Watchlist file {watchlist_file} already exists. Skipping extraction.")
             return read_csv(watchlist_file)
+        elif args.since:
+            if not os.path.exists(args.since):
+                print(f"Error: File {args.since} does not exist.")
+                return None
+            new_movies = save_watchlist(args.user, read_csv(args.since), args.resume, args.format)
+            if new_movies is not None:
+                print(f"Found {len(new_movies)} movies added since {args.since}.")
+            return new_movies
         else:
-            total_movies = get_total_movies(args.user)
-            print(f"Total number of movies to scrape: {total_movies}")
-            movies = scrape_watchlist(args.user, total_movies)
-            save_to_csv(movies, args.user)
-            return movies
+            return save_watchlist(args.user, resume=args.resume, output_format=args.format)
     elif args.title and args.year:
         print(f"Searching for {args.title} ({args.year})...")
-        return [{"Name": args.title, "Year": args.year, "Letterboxd URI": "Manual Search"}]
+        return [WatchlistFilm(args.title, args.year, "Manual Search")]
     else:
         print("Error: You must provide either a Letterboxd username (-u), a watchlist file (-f), or a movie title (-t) and year (-y) for manual search.")
         return None
 
-def process_movie(movie, missing_files, skipped_movies, downloaded_movies, output_dir):
-    movie_data = get_movie_data(movie["Name"], int(movie["Year"]))
+def find_torrent(movie, missing_files, skipped_movies, output_dir):
+    """Returns the best torrent to download for the movie, or None after recording why there is nothing to download."""
+    matched_dir = LIBRARY.find(movie["Name"], movie["Year"])
+    if matched_dir:
+        print(f"Skipping {movie['Name']} ({movie['Year']}) since '{matched_dir}' already exists.")
+        skipped_movies.append(f"{movie['Name']} ({movie['Year']}) - Already in library.")
+        return None
+
+    with METRICS.timer("stage_seconds", stage="yts_lookup"):
+        movie_data = find_movie_data(movie)
 
     if movie_data:
         print(f"Found movie in {EXISTING_MOVIES_DIRECTORY}: {movie_data['title']} ({movie_data['year']})")
         best_torrent = get_best_quality_torrent(movie_data["torrents"])
 
         if best_torrent:
-            torrent_url = best_torrent["url"]
             torrent_filename = f"{movie['Name']} ({movie['Year']}).torrent"
             torrent_file_path = os.path.join(output_dir, torrent_filename)
 
@@ -193,12 +371,95 @@ def process_movie(movie, missing_files, skipped_movies, downloaded_movies, outpu
                 print(f"Skipping {movie['Name']} ({movie['Year']}) as the torrent already exists in {output_dir}.")
                 skipped_movies.append(f"{movie['Name']} ({movie['Year']}) - Torrent already exists.")
             else:
-                download_torrent(torrent_url, movie["Name"], int(movie["Year"]), missing_files, output_dir)
-                downloaded_movies.append(f"{movie['Name']} ({movie['Year']})")
+                return best_torrent
         else:
             skipped_movies.append(f"{movie['Name']} ({movie['Year']}) - No suitable quality found.")
     else:
         missing_files.append({"title": movie["Name"], "year": movie["Year"], "error": "Not found."})
+    return None
+
+def process_movie(movie, missing_files, skipped_movies, downloaded_movies, output_dir):
+    best_torrent = find_torrent(movie, missing_files, skipped_movies, output_dir)
+    if best_torrent:
+        download_torrent(best_torrent["url"], movie["Name"], int(movie["Year"]), missing_files, output_dir, downloaded_movies, skipped_movies)
+
+def stream_watchlist(user, since, missing_files, skipped_movies, downloaded_movies, output_dir, output_format="csv", resume=False):
+    """Scrapes, matches and downloads the watchlist as one pipeline; with resume, skips the films an interrupted stream already saved."""
+    previous_movies = read_csv(since) if since else []
+    known_uris = {movie["Letterboxd URI"] for movie in previous_movies}
+    checkpoint = Checkpoint(f".watchlist-{user}.stream.checkpoint.json")
+    state = checkpoint.load() if resume else None
+    if state and state.get("user") == user and os.path.exists(f"{state['output']}.part"):
+        filename, mode, retry_uris = state["output"], "a", set(state.get("retry", ()))
+        saved_uris = {movie["Letterboxd URI"] for movie in read_csv(f"{filename}.part")}
+        print(f"Resuming {user}'s watchlist stream into {filename}, skipping {len(saved_uris - retry_uris)} films already done.")
+    else:
+        filename, mode, saved_uris = f"watchlist-{user}-{datetime.utcnow().strftime('%Y-%m-%d-%H-%M')}-utc.csv", "w", set()
+        retry_uris = set()
+        checkpoint.save(user=user, output=filename)
+    csv_lock = threading.Lock()
+    failed_uris = set()  # Films saved to the .part file whose match or download failed, retried on --resume
+
+    # Written to a .part file so that a failed run never truncates an earlier snapshot of the same name
+    with open(f"{filename}.part", mode=mode, newline="", encoding="utf-8") as file, tqdm(desc=f"Streaming {user}'s watchlist", unit="movies") as pbar:
+        writer = csv.DictWriter(file, fieldnames=list(WATCHLIST_SCHEMA))
+        if mode == "w":
+            writer.writeheader()
+
+        def posters():
+            for _, page_posters, known_films, _ in iter_watchlist_pages(user, known_uris):
+                for poster in page_posters:
+                    uri = get_poster_uri(poster)
+                    if uri not in saved_uris or uri in retry_uris:
+                        yield poster, known_films
+
+        def look_up(item):
+            movie = extract_movie_data_from_poster(*item)
+            if movie and movie["Letterboxd URI"] not in saved_uris:
+                with csv_lock, METRICS.timer("stage_seconds", stage="write"):
+                    writer.writerow(movie)
+                    file.flush()
+                    pbar.update(1)
+            return movie
+
+        def match(movie):
+            try:
+                best_torrent = find_torrent(movie, missing_files, skipped_movies, output_dir)
+            except Exception:
+                failed_uris.add(movie["Letterboxd URI"])
+                raise
+            return (movie, best_torrent) if best_torrent else None
+
+        def download(item):
+            movie, best_torrent = item
+            try:
+                download_torrent(best_torrent["url"], movie["Name"], int(movie["Year"]), missing_files, output_dir, downloaded_movies, skipped_movies)
+            except Exception:
+                failed_uris.add(movie["Letterboxd URI"])
+                raise
+
+        pipeline = Pipeline()
+        pipeline.add_stage(look_up, workers=LOOKUP_WORKERS)
+        pipeline.add_stage(match, workers=MATCH_WORKERS)
+        pipeline.add_stage(download, workers=DOWNLOAD_WORKERS)
+        try:
+            pipeline.run(posters())
+        except requests.RequestException as e:
+            checkpoint.save(user=user, output=filename, retry=sorted(failed_uris))
+            print(f"Stopped reading the watchlist after a failed fetch: {e}. Run again with --resume to continue.")
+            return
+        if pipeline.failures:
+            checkpoint.save(user=user, output=filename, retry=sorted(failed_uris))
+            print(f"{pipeline.failures} films could not be processed, so {filename}.part is kept. Run again with --resume to retry them.")
+            return
+        new_count = pbar.n + len(saved_uris)
+        writer.writerows(previous_movies)
+
+    os.replace(f"{filename}.part", filename)
+    checkpoint.clear()
+    with METRICS.timer("stage_seconds", stage="convert"):
+        filename = convert_csv(filename, WATCHLIST_SCHEMA, output_format)
+    print(f"Saved {new_count + len(previous_movies)} movies ({new_count} new) to {filename}.")
 
 def display_summary(missing_files, skipped_movies, downloaded_movies):
     print("\n-----------------------------------------")
@@ -230,23 +491,73 @@ def parse_arguments():
     parser = argparse.ArgumentParser(description="Scrape a Letterboxd user's watchlist or manually search for movies and download torrents.")
     parser.add_argument("-u", "--user", help="Letterboxd username to scrape watchlist from.")
     parser.add_argument("-f", "--file", help="CSV file containing movies to download.")
+    parser.add_argument("-s", "--since", help="Previous watchlist CSV; only films added after it are scraped and downloaded.")
     parser.add_argument("-t", "--title", help="Manually input the title of the movie.")
     parser.add_argument("-y", "--year", type=int, help="Manually input the year of the movie.")
+    parser.add_argument("--stream", action="store_true", help="With -u, look up and download films while the watchlist is still being scraped.")
+    parser.add_argument("--resume", action="store_true", help="With -u, continue an interrupted scrape from its last completed page (or, with --stream, skip the films already saved).")
     parser.add_argument("-o", "--output-dir", default=DEFAULT_OUTPUT_DIR, help="Directory to save torrents.")
-    return parser.parse_args()
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Directory for the on-disk HTTP cache shared by the scrapers.")
+    parser.add_argument("--no-cache", action="store_true", help="Always download pages instead of using the HTTP cache.")
+    parser.add_argument("--yts-mirror", nargs="?", const=DEFAULT_MIRROR_PATH, help="Match movies against a local YTS catalog mirror instead of querying the YTS API per movie.")
+    parser.add_argument("--sync-yts", action="store_true", help="Bring the local YTS mirror up to date before matching (implies --yts-mirror).")
+    parser.add_argument("--library-dir", default=EXISTING_MOVIES_DIRECTORY, help="Media library to check for movies that are already owned.")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG_PATH, help="SQLite film catalog that remembers titles, years and YTS ids by Letterboxd slug.")
+    parser.add_argument("--format", choices=FORMATS, default="csv", help="Format of the saved watchlist; parquet and arrow need pyarrow.")
+    parser.add_argument("--parse-workers", type=int, default=0, metavar="N",
+                        help="Parse watchlist and film pages in N worker processes so parsing scales with cores (default 0: parse in the fetch threads).")
+    parser.add_argument("--metrics", metavar="PREFIX", help="Record request, parse, YTS and download timings and save them to PREFIX.json and PREFIX.prom.")
+    parser.add_argument("--live-stats", action="store_true", help="Print a stats line every second while running.")
+    args = parser.parse_args()
+    if not available(args.format):
+        parser.error(f"--format {args.format} needs pyarrow (pip3 install pyarrow).")
+    if args.parse_workers < 0:
+        parser.error("--parse-workers must be 0 or more.")
+    return args
 
 if __name__ == "__main__":
     args = parse_arguments()
+    if args.parse_workers:
+        PARSE_POOL.start(args.parse_workers)  # Before any thread is started
+    if args.metrics or args.live_stats:
+        METRICS.enable()
+    if args.live_stats:
+        METRICS.start_live(write=tqdm.write)
+    SESSION = CachedSession(args.cache_dir, enabled=not args.no_cache, pool_maxsize=MAX_WORKERS)
+    CATALOG = FilmCatalog(args.catalog)
+    LIBRARY = LibraryIndex(args.library_dir)
+    if args.yts_mirror or args.sync_yts:
+        YTS_MIRROR = YTSMirror(args.yts_mirror or DEFAULT_MIRROR_PATH)
+    if args.sync_yts:
+        print(f"Synced {YTS_MIRROR.sync(SESSION, YTS_API_URL)} movies into the YTS mirror at {YTS_MIRROR.path}.")
+    if YTS_MIRROR and not YTS_MIRROR.movie_count():
+        print(f"Warning: The YTS mirror at {YTS_MIRROR.path} is empty, so no movie will be found. Run with --sync-yts to download the catalog.")
+    elif YTS_MIRROR and not YTS_MIRROR.sync_finished():
+        print(f"Warning: The YTS mirror at {YTS_MIRROR.path} is incomplete because its last sync did not finish. Run with --sync-yts to resume it.")
 
     missing_files, skipped_movies, downloaded_movies = [], [], []
     output_dir = TORRENT_DIRECTORY
-    watchlist = get_watchlist(args)
+    watchlist = None
+    if args.stream and args.user:
+        if args.since and not os.path.exists(args.since):
+            print(f"Error: File {args.since} does not exist.")
+        else:
+            stream_watchlist(args.user, args.since, missing_files, skipped_movies, downloaded_movies, output_dir, args.format, args.resume)
+    elif not args.sync_yts or args.user or args.file or args.title:
+        watchlist = get_watchlist(args)
 
     if watchlist:
-        with ThreadPoolExecutor(max_workers=10) as executor:
+        watchlist = dedupe_movies(watchlist)
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
             futures = [executor.submit(process_movie, movie, missing_files, skipped_movies, downloaded_movies, output_dir) for movie in watchlist]
             for future in as_completed(futures):
                 pass
 
+    PARSE_POOL.shutdown()
+    METRICS.stop_live()
     display_summary(missing_files, skipped_movies, downloaded_movies)
+    if SESSION.enabled:
+        print(SESSION.summary())
+    if args.metrics:
+        METRICS.write(args.metrics)
     
\ No newline at end of file
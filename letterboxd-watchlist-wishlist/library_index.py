@@ -0,0 +1,128 @@
+"""Index of the movies already in the local media library.
+
+Folder names such as "Blade Runner (1982)", "Blade.Runner.1982.1080p" or
+"Amélie" are parsed into a normalized (title, year) once, so "already
+owned?" is a set lookup instead of a listing and substring scan per movie.
+Folders named with a year are taken as movies and not descended into, so
+their Subs or Extras folders are never indexed as titles.
+The directory tree is persisted with each directory's mtime; on refresh only
+directories whose mtime changed are listed again, which keeps NAS-mounted
+libraries cheap to re-check between runs.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+
+from letterboxd_common.film_catalog import normalize_title
+from letterboxd_common.http_cache import DEFAULT_CACHE_DIR
+
+# The last bracketed year wins, so "Blade Runner 2049 (2017) [2160p]" is Blade Runner 2049 from 2017
+BRACKETED_YEAR = re.compile(r"^(?P<title>.+)[\[(](?P<year>(?:19|20)\d{2})[\])]")
+# Otherwise the last year-like word, so "Blade.Runner.2049.2017.1080p" is Blade Runner 2049 from 2017
+FOLDER_PATTERN = re.compile(r"^(?P<title>.+)[\s._\-]+(?P<year>(?:19|20)\d{2})(?P<rest>(?:[\s._\-\[(].*)?)$")
+
+
+def folder_keys(name):
+    """Returns the (normalized title, year or None) pairs a movie folder name may stand for, most likely first.
+
+    A trailing year without brackets may be part of the title ("Blade Runner 2049"), so the whole name is a second, undated key.
+    """
+    match = BRACKETED_YEAR.match(name)
+    if match:
+        return [(normalize_title(match.group("title")), int(match.group("year")))]
+    match = FOLDER_PATTERN.match(name)
+    if match and match.group("rest"):
+        return [(normalize_title(match.group("title")), int(match.group("year")))]
+    if match:
+        return [(normalize_title(match.group("title")), int(match.group("year"))), (normalize_title(name), None)]
+    return [(normalize_title(name), None)]
+
+
+def parse_folder_name(name):
+    """Returns (normalized title, year or None) for a movie folder name."""
+    return folder_keys(name)[0]
+
+
+class LibraryIndex:
+    """Persistent, incrementally refreshed index of movie folders under a library root."""
+
+    def __init__(self, root, index_path=None, max_depth=2):
+        self.root = os.path.abspath(root)
+        digest = hashlib.sha1(self.root.encode("utf-8")).hexdigest()[:12]
+        self.index_path = index_path or os.path.join(DEFAULT_CACHE_DIR, f"library-{digest}.json")
+        self.max_depth = max_depth
+        self.directories = {}
+        self.by_title_year = {}
+        self.by_title = {}
+        self.undated = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def refresh(self):
+        """Re-lists directories whose mtime changed since the last scan and rebuilds the lookup tables."""
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        if not self._loaded:
+            try:
+                with open(self.index_path, encoding="utf-8") as index_file:
+                    stored = json.load(index_file)
+                if stored.get("root") == self.root:
+                    self.directories = stored["directories"]
+            except (OSError, ValueError, KeyError):
+                self.directories = {}
+            self._loaded = True
+
+        previous, self.directories, changed = self.directories, {}, False
+        pending = [(self.root, 0)]
+        while pending:
+            path, depth = pending.pop()
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                changed = True
+                continue
+            entry = previous.get(path)
+            if entry is None or entry["mtime"] != mtime:
+                try:
+                    subdirs = sorted(item.name for item in os.scandir(path) if item.is_dir())
+                except OSError:
+                    subdirs = []
+                entry, changed = {"mtime": mtime, "subdirs": subdirs}, True
+            self.directories[path] = entry
+            if depth < self.max_depth:
+                # A folder named with a year is a movie, and its own subfolders (Subs, Extras, ...) are not titles
+                pending.extend((os.path.join(path, name), depth + 1) for name in entry["subdirs"] if parse_folder_name(name)[1] is None)
+        changed = changed or previous.keys() != self.directories.keys()
+
+        self.by_title_year, self.by_title, self.undated = {}, {}, {}
+        for path, entry in self.directories.items():
+            for name in entry["subdirs"]:
+                for title, year in folder_keys(name):
+                    self.by_title.setdefault(title, name)
+                    if year is None:
+                        self.undated.setdefault(title, name)
+                    else:
+                        self.by_title_year.setdefault((title, year), name)
+
+        if changed:
+            os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+            with open(f"{self.index_path}.tmp", "w", encoding="utf-8") as index_file:
+                json.dump({"root": self.root, "directories": self.directories}, index_file)
+            os.replace(f"{self.index_path}.tmp", self.index_path)
+
+    def find(self, title, year=None):
+        """Returns the library folder name holding the movie, or None if it is not owned."""
+        with self._lock:
+            if not self._loaded:
+                self._refresh()
+        key = normalize_title(title)
+        try:
+            year = int(year)
+        except (TypeError, ValueError):
+            return self.by_title.get(key)
+        # Folders without a year in their name still count as owned by title alone
+        return self.by_title_year.get((key, year)) or self.undated.get(key)
@@ -0,0 +1,74 @@
+"""Staged pipeline with bounded queues between stages.
+
+Each stage has its own worker threads and a bounded inbox, so a slow stage
+pushes back on the ones before it instead of letting work pile up in memory,
+and items reach the last stage as soon as they are ready rather than after
+the previous phase has finished for every item.
+"""
+import queue
+import threading
+
+DONE = object()
+
+
+class Pipeline:
+    """Runs items from a source iterable through a chain of stage handlers.
+
+    A handler takes one item and returns the item for the next stage, or None
+    to drop it. Exceptions are reported and drop only the item that raised;
+    failures counts them for the last run, so callers can tell a partial run.
+    """
+
+    def __init__(self):
+        self.stages = []
+        self.failures = 0
+        self._failures_lock = threading.Lock()
+
+    def add_stage(self, handler, workers=1, queue_size=None):
+        """Appends a stage run by `workers` threads reading from a queue of at most `queue_size` items."""
+        self.stages.append((handler, workers, queue_size or workers * 2))
+        return self
+
+    def run(self, source):
+        """Feeds the source into the first stage from the calling thread and returns once every stage has drained."""
+        self.failures = 0
+        queues = [queue.Queue(maxsize=queue_size) for _, _, queue_size in self.stages]
+        threads = []
+        for index, (handler, workers, _) in enumerate(self.stages):
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+            next_workers = self.stages[index + 1][1] if outbox else 0
+            remaining = {"workers": workers, "lock": threading.Lock()}
+            for _ in range(workers):
+                thread = threading.Thread(target=self._work, args=(handler, queues[index], outbox, remaining, next_workers), daemon=True)
+                thread.start()
+                threads.append(thread)
+        try:
+            for item in source:
+                queues[0].put(item)
+        finally:
+            for _ in range(self.stages[0][1]):
+                queues[0].put(DONE)
+            for thread in threads:
+                thread.join()
+
+    def _work(self, handler, inbox, outbox, remaining, next_workers):
+        while True:
+            item = inbox.get()
+            if item is DONE:
+                break
+            try:
+                result = handler(item)
+            except Exception as e:
+                print(f"Error in {getattr(handler, '__name__', 'pipeline')} stage: {e}")
+                with self._failures_lock:
+                    self.failures += 1
+                continue
+            if result is not None and outbox is not None:
+                outbox.put(result)
+        # The last worker out of a stage tells every worker of the next stage to finish
+        with remaining["lock"]:
+            remaining["workers"] -= 1
+            last = remaining["workers"] == 0
+        if last and outbox is not None:
+            for _ in range(next_workers):
+                outbox.put(DONE)
@@ -0,0 +1,69 @@
+"""Request coalescing with a bounded memo of finished results.
+
+The first caller for a key runs the call; callers asking for the same key
+while it runs wait for it and share its result instead of repeating the
+request, and finished results are kept in a least-recently-used memo so later
+identical calls return at once. A call that raises is not memoized: its
+exception is re-raised in every caller that was waiting for it, and the next
+caller tries again.
+"""
+import threading
+from collections import OrderedDict
+
+from letterboxd_common.metrics import METRICS
+
+
+class Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls per key and memoizes up to maxsize results."""
+
+    def __init__(self, name, maxsize=4096):
+        self.name = name
+        self.maxsize = maxsize
+        self._results = OrderedDict()
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function, *args):
+        """Returns function(*args), sharing an in-flight or memoized result for the same key."""
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                result = self._results[key]
+                outcome = "hits"
+            else:
+                call = self._calls.get(key)
+                outcome = "shared" if call else "misses"
+                if not call:
+                    call = self._calls[key] = Call()
+        METRICS.inc("memo_lookups_total", memo=self.name, result=outcome)
+        if outcome == "hits":
+            return result
+        if outcome == "shared":
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function(*args)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is None:
+                    self._results[key] = call.result
+                    if len(self._results) > self.maxsize:
+                        self._results.popitem(last=False)
+            call.done.set()
+        return call.result
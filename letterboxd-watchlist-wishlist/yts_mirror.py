@@ -0,0 +1,139 @@
+"""Local mirror of the YTS catalog for offline title/year matching.
+
+The catalog is synced into SQLite newest-first through list_movies.json. A
+sync pass runs from the newest movie down to the newest one of the last
+finished pass, so a daily sync is a page or two. The page a pass has reached is
+saved after every page, and an interrupted pass (the first full download in
+particular) resumes there on the next sync instead of being taken as done.
+Matching then runs in memory: an exact hash lookup on the normalized
+(title, year), then the same title a year either side (Letterboxd and YTS
+disagree on some release years), then a fuzzy match among that year's titles.
+"""
+import difflib
+import json
+import os
+import re
+import threading
+
+from letterboxd_common.film_catalog import normalize_title
+from letterboxd_common.http_cache import DEFAULT_CACHE_DIR
+from letterboxd_common.sqlite_db import open_shared
+
+DEFAULT_MIRROR_PATH = os.path.join(DEFAULT_CACHE_DIR, "yts.sqlite3")
+PAGE_SIZE = 50
+FUZZY_CUTOFF = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS movies (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    title_english TEXT,
+    year INTEGER,
+    date_uploaded_unix INTEGER,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class YTSMirror:
+    """SQLite copy of the YTS catalog with an in-memory (title, year) index."""
+
+    def __init__(self, path=DEFAULT_MIRROR_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = None
+        self._exact = None
+        self._titles_by_year = None
+
+    def _connect(self):
+        if self._db is None:
+            self._db = open_shared(self.path, SCHEMA)
+        return self._db
+
+    def _state(self, key, default=None):
+        # Called with the lock held
+        row = self._connect().execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def movie_count(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM movies").fetchone()[0]
+
+    def sync_finished(self):
+        """Whether a sync pass has ever run to completion, i.e. the mirror holds the whole catalog."""
+        with self._lock:
+            return self._state("synced_until") is not None
+
+    def sync(self, session, api_url):
+        """Fetches movies added since the last finished sync (the whole catalog the first time) and returns how many were stored.
+
+        An interrupted sync picks up at the page it had reached.
+        """
+        with self._lock:
+            # page: next page to fetch; until: newest upload of the last finished pass; newest: newest upload seen by this pass
+            sync_pass = self._state("pass") or {"page": 1, "until": self._state("synced_until", 0), "newest": 0}
+        stored = 0
+        while True:
+            response = session.get(f"{api_url}list_movies.json",
+                                   params={"sort_by": "date_added", "order_by": "desc", "limit": PAGE_SIZE, "page": sync_pass["page"]},
+                                   headers={"Cache-Control": "no-cache"})
+            response.raise_for_status()
+            movies = response.json().get("data", {}).get("movies") or []
+            rows = [(movie["id"], movie["title"], movie.get("title_english"), movie.get("year"), movie.get("date_uploaded_unix") or 0, json.dumps(movie))
+                    for movie in movies]
+            sync_pass["newest"] = max([sync_pass["newest"]] + [row[4] for row in rows])
+            # Movies uploaded in the same second as the previous pass's newest one are re-read rather than missed.
+            # Uploads during a pass only push older movies onto later pages, so resuming at the saved page never skips one.
+            finished = len(movies) < PAGE_SIZE or min(row[4] for row in rows) < sync_pass["until"]
+            sync_pass["page"] += 1
+            with self._lock:
+                db = self._connect()
+                db.executemany("INSERT OR REPLACE INTO movies VALUES (?, ?, ?, ?, ?, ?)", rows)
+                if finished:
+                    db.execute("INSERT OR REPLACE INTO sync_state VALUES ('synced_until', ?)", (json.dumps(sync_pass["newest"]),))
+                    db.execute("DELETE FROM sync_state WHERE key = 'pass'")
+                else:
+                    db.execute("INSERT OR REPLACE INTO sync_state VALUES ('pass', ?)", (json.dumps(sync_pass),))
+                db.commit()
+                self._exact = self._titles_by_year = None
+            stored += len(rows)
+            if finished:
+                return stored
+
+    def _index(self):
+        # Called with the lock held; built once per sync from the title columns only.
+        if self._exact is None:
+            self._exact, self._titles_by_year = {}, {}
+            for movie_id, title, title_english, year in self._connect().execute("SELECT id, title, title_english, year FROM movies"):
+                for name in {title, title_english or title}:
+                    key = normalize_title(name)
+                    self._exact.setdefault((key, year), movie_id)
+                    self._titles_by_year.setdefault(year, {}).setdefault(key, movie_id)
+        return self._exact, self._titles_by_year
+
+    def get(self, movie_id):
+        """Returns the stored YTS movie dict (including torrents) for an id, or None."""
+        with self._lock:
+            row = self._connect().execute("SELECT data FROM movies WHERE id = ?", (movie_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def match(self, title, year):
+        """Returns the best YTS movie dict for a Letterboxd title and year, or None."""
+        key = normalize_title(title)
+        with self._lock:
+            exact, titles_by_year = self._index()
+            movie_id = exact.get((key, year))
+            for nearby_year in (year - 1, year + 1):
+                if movie_id is None:
+                    movie_id = exact.get((key, nearby_year))
+            if movie_id is None:
+                # Numbers must agree exactly so that sequels and remakes are never confused for each other
+                numbers = re.findall(r"\d+", key)
+                close = [candidate for candidate in difflib.get_close_matches(key, titles_by_year.get(year, {}), n=3, cutoff=FUZZY_CUTOFF)
+                         if re.findall(r"\d+", candidate) == numbers]
+                movie_id = titles_by_year[year][close[0]] if close else None
+        return self.get(movie_id) if movie_id is not None else None
@@ -0,0 +1,8 @@
+"""Modules shared by the Letterboxd tools: HTTP caching and rate limiting,
+metrics, film records and the film catalog, poster grid parsing, the parse
+process pool, checkpoints, columnar output and the SQLite connections the
+stores share between threads.
+
+Each tool's entry point puts the repository root on sys.path and imports them
+as letterboxd_common.<module>.
+"""
@@ -0,0 +1,32 @@
+"""Checkpoint files for resumable scrapes.
+
+A checkpoint is a small JSON document (user, output file, last completed page,
+cursor) rewritten atomically after every page that has been appended to the
+output, so a crashed or interrupted run can pick up where it stopped.
+"""
+import json
+import os
+
+
+class Checkpoint:
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        """Returns the saved state, or None when there is no usable checkpoint."""
+        try:
+            with open(self.path, encoding="utf-8") as checkpoint_file:
+                return json.load(checkpoint_file)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, **state):
+        with open(f"{self.path}.tmp", "w", encoding="utf-8") as checkpoint_file:
+            json.dump(state, checkpoint_file)
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
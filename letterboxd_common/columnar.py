@@ -0,0 +1,91 @@
+"""Typed columnar output: CSV, Parquet and Arrow IPC files from the same rows.
+
+Tables are built column by column with explicit types (ratings as int8, years
+as int16, ...) so Parquet and Arrow files load straight into analytics jobs
+without re-parsing text. pyarrow is only needed for the Parquet and Arrow
+formats; CSV output works without it.
+"""
+import csv
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+FORMATS = ("csv", "parquet", "arrow")
+
+
+def available(output_format):
+    """Returns whether the format can be written with the installed packages."""
+    return output_format == "csv" or pa is not None
+
+
+def with_extension(filename, output_format):
+    return f"{os.path.splitext(filename)[0]}.{output_format}"
+
+
+def columns(rows, schema):
+    """Returns {name: [values]} for the schema's fields; numeric columns hold numbers or None (e.g. for "Unknown" years).
+
+    rows may also be a film_records.FilmColumns batch, whose columns are used as they are.
+    """
+    if hasattr(rows, "columns"):
+        batch = rows.columns()
+        return {name: batch[name] for name in schema}
+    table = {}
+    for name, column_type in schema.items():
+        values = [row.get(name) for row in rows]
+        if column_type.startswith("int"):
+            values = [int(value) if isinstance(value, int) or (isinstance(value, str) and value.isdigit()) else None for value in values]
+        elif column_type.startswith("float"):
+            values = [float(value) if value not in (None, "") else None for value in values]
+        table[name] = values
+    return table
+
+
+def to_arrow(rows, schema):
+    """Builds a pyarrow Table with one typed array per schema field."""
+    return pa.table({name: pa.array(values, type=getattr(pa, schema[name])()) for name, values in columns(rows, schema).items()})
+
+
+def write_arrow(table, filename, output_format):
+    if output_format == "parquet":
+        pq.write_table(table, filename, compression="zstd")
+    else:
+        with pa.OSFile(filename, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def write_table(rows, filename, schema, output_format="csv"):
+    """Writes the rows (dicts, records or a FilmColumns batch) in the given format and returns the filename, with its extension matching the format."""
+    filename = with_extension(filename, output_format)
+    if output_format == "csv":
+        with open(filename, mode="w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=list(schema), extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        write_arrow(to_arrow(rows, schema), filename, output_format)
+    return filename
+
+
+def read_rows(filename):
+    """Reads back a list of row dicts from a CSV, Parquet or Arrow file, by extension."""
+    if filename.endswith(".parquet"):
+        return pq.read_table(filename).to_pylist()
+    if filename.endswith(".arrow"):
+        with pa.memory_map(filename) as source:
+            return pa.ipc.open_file(source).read_all().to_pylist()
+    with open(filename, newline="", encoding="utf-8") as file:
+        return list(csv.DictReader(file))
+
+
+def convert_csv(csv_filename, schema, output_format):
+    """Rewrites a finished CSV in the given format, removes the CSV and returns the new filename."""
+    if output_format == "csv":
+        return csv_filename
+    filename = write_table(read_rows(csv_filename), csv_filename, schema, output_format)
+    os.remove(csv_filename)
+    return filename
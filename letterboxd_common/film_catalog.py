@@ -0,0 +1,100 @@
+"""Persistent film catalog keyed by Letterboxd slug.
+
+Stores each film's title, release year and, once a YTS match has been found,
+its YTS movie id. Entries are filled lazily as the scrapers come across films
+and read in bulk per page, so films seen on an earlier run never cost another
+request. All tools default to the same SQLite file, next to the HTTP cache.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from .http_cache import DEFAULT_CACHE_DIR
+from .sqlite_db import open_shared
+
+DEFAULT_CATALOG_PATH = os.path.join(DEFAULT_CACHE_DIR, "films.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS films (
+    slug TEXT PRIMARY KEY,
+    title TEXT,
+    year INTEGER,
+    yts_id INTEGER,
+    updated_at REAL NOT NULL
+)
+"""
+
+UPSERT = """
+INSERT INTO films (slug, title, year, yts_id, updated_at) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(slug) DO UPDATE SET
+    title = COALESCE(excluded.title, title),
+    year = COALESCE(excluded.year, year),
+    yts_id = COALESCE(excluded.yts_id, yts_id),
+    updated_at = excluded.updated_at
+"""
+
+# Stay well below SQLite's limit on bound parameters per statement
+BATCH_SIZE = 500
+
+
+def slug_from_link(link):
+    """Returns the film slug from a '/film/<slug>/' path or URL, or None for anything else."""
+    if not link or "/film/" not in link:
+        return None
+    return link.split("/film/", 1)[1].strip("/").split("/", 1)[0] or None
+
+
+def normalize_title(title):
+    """Lowercases, strips accents and punctuation, and collapses whitespace."""
+    title = unicodedata.normalize("NFKD", str(title)).encode("ascii", "ignore").decode("ascii")
+    title = re.sub(r"[^a-z0-9]+", " ", title.lower().replace("&", " and "))
+    return " ".join(title.split())
+
+
+class FilmCatalog:
+    """Thread-safe slug -> (title, year, yts_id) store backed by SQLite."""
+
+    def __init__(self, path=DEFAULT_CATALOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            self._db = open_shared(self.path, SCHEMA, sqlite3.Row)
+        return self._db
+
+    def get(self, slug):
+        """Returns the catalog entry for one slug, or None if it is unknown."""
+        return self.get_many([slug]).get(slug)
+
+    def get_many(self, slugs):
+        """Returns a {slug: {"title", "year", "yts_id"}} dict for the slugs already in the catalog."""
+        slugs = list(dict.fromkeys(slug for slug in slugs if slug))
+        films = {}
+        with self._lock:
+            db = self._connect()
+            for start in range(0, len(slugs), BATCH_SIZE):
+                batch = slugs[start:start + BATCH_SIZE]
+                placeholders = ", ".join("?" * len(batch))
+                for row in db.execute(f"SELECT slug, title, year, yts_id FROM films WHERE slug IN ({placeholders})", batch):
+                    films[row["slug"]] = {"title": row["title"], "year": row["year"], "yts_id": row["yts_id"]}
+        return films
+
+    def update(self, slug, title=None, year=None, yts_id=None):
+        """Records what is known about a film; fields left as None keep their stored value."""
+        self.update_many([(slug, title, year, yts_id)])
+
+    def update_many(self, films):
+        """Records many (slug, title, year, yts_id) tuples in one transaction."""
+        now = time.time()
+        rows = [(slug, title, year, yts_id, now) for slug, title, year, yts_id in films if slug]
+        if not rows:
+            return
+        with self._lock:
+            db = self._connect()
+            db.executemany(UPSERT, rows)
+            db.commit()
@@ -0,0 +1,132 @@
+"""Compact film records and column batches for large result sets.
+
+A dict per film carries its own hash table (about 200 bytes before any value)
+for the same three keys on every film. Records keep the values in __slots__
+instead, and still read like the dicts they replace: film["title"],
+film.get("link"), dict(film) and csv.DictWriter all work unchanged.
+
+FilmColumns goes one step further for large result sets such as batch output
+or the fan finder's title index: one list per text column and one typed array
+per integer column, so a film costs a few pointers and bytes rather than an
+object of its own.
+"""
+from array import array
+from collections.abc import Mapping
+
+LETTERBOXD_URL = "https://letterboxd.com"
+TYPECODES = {"int8": "b", "int16": "h", "int32": "i", "int64": "q"}
+
+
+class Record(Mapping):
+    """Base for __slots__ records that read like dicts keyed by column name.
+
+    COLUMNS maps each column name to the attribute (or property) holding it.
+    """
+
+    __slots__ = ()
+    COLUMNS = {}
+
+    def __getitem__(self, column):
+        try:
+            attribute = self.COLUMNS[column]
+        except KeyError:
+            raise KeyError(column) from None
+        return getattr(self, attribute)
+
+    def __iter__(self):
+        return iter(self.COLUMNS)
+
+    def __len__(self):
+        return len(self.COLUMNS)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+    def __reduce__(self):
+        # Pickled as the constructor call, e.g. when records come back from a parse process
+        cls = type(self)
+        return cls, tuple(getattr(self, name) for klass in reversed(cls.__mro__) for name in getattr(klass, "__slots__", ()))
+
+
+class RatedFilm(Record):
+    """A film from a rated or ratings page: title, Letterboxd path (/film/slug/) and rating.
+
+    Only the path is stored; the full link is built when it is read.
+    """
+
+    __slots__ = ("title", "path", "rating")
+    COLUMNS = {"title": "title", "link": "link", "rating": "rating"}
+
+    def __init__(self, title, path, rating):
+        self.title = title
+        self.path = path
+        self.rating = rating
+
+    @property
+    def link(self):
+        return f"{LETTERBOXD_URL}{self.path}" if self.path else "Unknown"
+
+
+class WatchlistFilm(Record):
+    """A watchlist row: name, year (or "Unknown") and Letterboxd URI."""
+
+    __slots__ = ("name", "year", "uri")
+    COLUMNS = {"Name": "name", "Year": "year", "Letterboxd URI": "uri"}
+
+    def __init__(self, name, year, uri):
+        self.name = name
+        self.year = year
+        self.uri = uri
+
+
+def int_value(value):
+    if isinstance(value, int):
+        return value
+    return int(value) if isinstance(value, str) and value.isdigit() else 0
+
+
+class FilmColumns:
+    """Column-oriented rows for a schema like columnar's ({name: "string" | "int8" | ...}).
+
+    Integer columns are typed arrays in which 0 stands for a missing value (no
+    rating, "Unknown" year) and reads back as None; every other column is a
+    plain list. Rows are added as sequences in schema order (append) or as
+    mappings (extend), and read back as tuples (row), dicts (iteration, e.g. for
+    csv.DictWriter) or whole columns (columns, used by columnar.write_table).
+    """
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.data = {name: array(TYPECODES[column_type]) if column_type in TYPECODES else [] for name, column_type in schema.items()}
+
+    def __len__(self):
+        return len(next(iter(self.data.values()), ()))
+
+    def append(self, values):
+        """Adds one row given as a sequence in schema order."""
+        for column, column_type, value in zip(self.data.values(), self.schema.values(), values):
+            column.append(int_value(value) if column_type in TYPECODES else value)
+
+    def extend(self, rows, **extra):
+        """Adds mapping rows (records or dicts); extra gives a value for every row, e.g. user=..."""
+        names = list(self.schema)
+        for row in rows:
+            self.append([extra[name] if name in extra else row.get(name) for name in names])
+
+    def row(self, position):
+        """Returns one row as a tuple in schema order."""
+        return tuple(self.data[name][position] or None if column_type in TYPECODES else self.data[name][position]
+                     for name, column_type in self.schema.items())
+
+    def column(self, name):
+        """Returns a column's values, with None for missing numbers."""
+        values = self.data[name]
+        return [value or None for value in values] if self.schema[name] in TYPECODES else values
+
+    def columns(self):
+        return {name: self.column(name) for name in self.schema}
+
+    def __iter__(self):
+        names = list(self.schema)
+        for position in range(len(self)):
+            yield dict(zip(names, self.row(position)))
@@ -0,0 +1,223 @@
+"""Persistent on-disk HTTP cache shared by the Letterboxd scrapers.
+
+Response bodies are stored as files named after a hash of the URL, with an
+SQLite index holding validators, sizes and access times. Entries younger than
+their host's TTL are served without touching the network; older ones are
+revalidated with If-None-Match / If-Modified-Since, so unchanged pages cost a
+304 instead of a full download. The index is capped by total body size and
+evicts least recently used entries first.
+
+Every tool defaults to the same cache directory, so a page fetched by one
+scraper is a hit for the others.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from .metrics import METRICS
+from .rate_limit import DEFAULT_LIMITER, THROTTLED_STATUSES
+from .sqlite_db import open_shared
+
+DEFAULT_CACHE_DIR = os.environ.get("LETTERBOXD_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "letterboxd-scratchpad"))
+DEFAULT_TTLS = {"letterboxd.com": 6 * 60 * 60, "yts.mx": 24 * 60 * 60}
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    content_type TEXT,
+    encoding TEXT,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+)
+"""
+
+
+class CachedSession(requests.Session):
+    """A requests session that caches successful GET responses on disk.
+
+    Streaming requests (torrent downloads) and non-GET requests bypass the
+    cache. Responses served from the cache carry ``from_cache = True``.
+    Requests that do reach the network wait for a slot from the rate limiter,
+    and throttled (429/503) responses are retried up to max_retries times.
+    When METRICS is enabled every network request, retry and cache lookup is
+    recorded there.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttls=None, default_ttl=0, max_bytes=DEFAULT_MAX_BYTES, enabled=True, pool_maxsize=10,
+                 limiter=DEFAULT_LIMITER, max_retries=3):
+        super().__init__()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self.cache_dir = os.path.join(cache_dir, "http")
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0}
+        self._lock = threading.Lock()
+        self._db = None
+
+    def ttl_for(self, url):
+        """Returns the freshness lifetime in seconds for the URL's host."""
+        host = urlsplit(url).hostname or ""
+        for suffix, ttl in self.ttls.items():
+            if host == suffix or host.endswith(f".{suffix}"):
+                return ttl
+        return self.default_ttl
+
+    def summary(self):
+        """Returns a one-line description of the hit/miss counters."""
+        return f"HTTP cache: {self.stats['hits']} hits, {self.stats['revalidated']} revalidated, {self.stats['misses']} misses"
+
+    def send(self, request, **kwargs):
+        if not self.enabled or request.method != "GET" or kwargs.get("stream"):
+            return self._send_throttled(request, **kwargs)
+
+        entry = self._lookup(request.url)
+        # A "Cache-Control: no-cache" request skips the TTL but still revalidates
+        revalidate = "no-cache" in request.headers.get("Cache-Control", "")
+        if entry and not revalidate and time.time() - entry["stored_at"] < self.ttl_for(request.url):
+            self._count("hits")
+            return self._build_response(request, entry)
+
+        if entry:
+            if entry["etag"]:
+                request.headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                request.headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = self._send_throttled(request, **kwargs)
+        if response.status_code == 304 and entry:
+            self._count("revalidated")
+            self._refresh(request.url)
+            return self._build_response(request, entry)
+
+        self._count("misses")
+        if response.status_code == 200:
+            self._store(request.url, response)
+        return response
+
+    def _send_throttled(self, request, **kwargs):
+        if self.limiter is None:
+            return self._send_measured(request, **kwargs)
+        for attempt in range(self.max_retries + 1):
+            queued_at = time.perf_counter()
+            with self.limiter.slot(request.url) as slot:
+                if METRICS.enabled:
+                    METRICS.observe("rate_limit_wait_seconds", time.perf_counter() - queued_at, host=urlsplit(request.url).hostname or "")
+                response = self._send_measured(request, **kwargs)
+                slot.observe(response)
+            if response.status_code not in THROTTLED_STATUSES or attempt == self.max_retries:
+                return response
+            # The limiter has already slowed the host down and honours Retry-After on the next slot
+            METRICS.inc("http_retries_total", host=urlsplit(request.url).hostname or "")
+            response.close()
+        return response
+
+    def _send_measured(self, request, **kwargs):
+        if not METRICS.enabled:
+            return super().send(request, **kwargs)
+        host = urlsplit(request.url).hostname or ""
+        start = time.perf_counter()
+        try:
+            response = super().send(request, **kwargs)
+        except requests.RequestException:
+            METRICS.inc("http_requests_total", host=host, status="error")
+            raise
+        METRICS.observe("http_request_seconds", time.perf_counter() - start, host=host)
+        METRICS.inc("http_requests_total", host=host, status=response.status_code)
+        # Streamed bodies (torrent downloads) have not been read yet, so count what the server announced
+        size = response.headers.get("Content-Length") if kwargs.get("stream") else len(response.content)
+        METRICS.inc("http_response_bytes_total", int(size or 0), host=host)
+        return response
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+        METRICS.inc("cache_lookups_total", result=key)
+
+    def _connect(self):
+        if self._db is None:
+            self._db = open_shared(os.path.join(self.cache_dir, "index.sqlite3"), SCHEMA, sqlite3.Row)
+        return self._db
+
+    def _lookup(self, url):
+        with self._lock:
+            row = self._connect().execute("SELECT * FROM responses WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        try:
+            with open(os.path.join(self.cache_dir, row["filename"]), "rb") as body:
+                return dict(row, content=body.read())
+        except OSError:
+            return None
+
+    def _refresh(self, url):
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            db.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+            db.commit()
+
+    def _store(self, url, response):
+        filename = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        path = os.path.join(self.cache_dir, filename)
+        content = response.content
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            with open(f"{path}.tmp", "wb") as body:
+                body.write(content)
+            os.replace(f"{path}.tmp", path)
+            db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, filename, response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                 response.headers.get("Content-Type"), response.encoding, len(content), now, now),
+            )
+            self._evict(db)
+            db.commit()
+
+    def _evict(self, db):
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, filename, size in db.execute("SELECT url, filename, size FROM responses ORDER BY accessed_at").fetchall():
+            db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            try:
+                os.remove(os.path.join(self.cache_dir, filename))
+            except OSError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def _build_response(self, request, entry):
+        with self._lock:
+            db = self._connect()
+            db.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), request.url))
+            db.commit()
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = request.url
+        response.request = request
+        response.headers = CaseInsensitiveDict({"Content-Type": entry["content_type"] or "text/html"})
+        response.encoding = entry["encoding"]
+        response._content = entry["content"]
+        response.from_cache = True
+        return response
@@ -0,0 +1,202 @@
+"""Per-stage run metrics for the Letterboxd tools.
+
+Counters and latency histograms are keyed by name and labels (host, status,
+stage, ...). The HTTP cache records every request, cache hit and retry, and
+the scrapers time their parse and write stages. At the end of a run the
+totals can be written as a JSON summary and in the Prometheus text format,
+and a background thread can print a live stats line while the run is going.
+
+Recording is off until METRICS.enable() is called; until then every hook
+returns after a single attribute check.
+"""
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Upper bounds in seconds, Prometheus style; the last bucket is +Inf
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PREFIX = "letterboxd_"
+DISABLED_TIMER = nullcontext()
+
+
+class Histogram:
+    """Fixed-bucket histogram; percentiles are estimated as the upper bound of the bucket they fall in."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            index = len(self.buckets)
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, fraction):
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def summary(self):
+        return {"count": self.count, "sum": round(self.sum, 6), "mean": round(self.sum / self.count, 6) if self.count else None,
+                "p50": self.percentile(0.5), "p90": self.percentile(0.9), "p99": self.percentile(0.99)}
+
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def format_labels(key, extra=()):
+    pairs = [f'{name}="{value}"' for name, value in key + tuple(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metrics:
+    """Thread-safe registry of counters and histograms for one run."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.counters = {}
+        self.histograms = {}
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._live = None
+
+    def enable(self):
+        """Starts recording; the run's elapsed time is measured from here."""
+        self.enabled = True
+        self.started_at = time.monotonic()
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = label_key(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = label_key(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(seconds)
+
+    def timer(self, name, **labels):
+        """Returns a context manager that observes its duration under name, or a no-op one when disabled."""
+        if not self.enabled:
+            return DISABLED_TIMER
+        return self._timer(name, labels)
+
+    @contextmanager
+    def _timer(self, name, labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def total(self, name, **labels):
+        """Sums a counter over every series whose labels include the given ones."""
+        wanted = set(labels.items())
+        with self._lock:
+            return sum(value for key, value in self.counters.get(name, {}).items() if wanted <= set(key))
+
+    def merged_histogram(self, name):
+        merged = Histogram()
+        with self._lock:
+            for histogram in self.histograms.get(name, {}).values():
+                merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+                merged.count += histogram.count
+                merged.sum += histogram.sum
+        return merged
+
+    def summary(self):
+        """Returns every counter and histogram as a JSON-serializable dict."""
+        with self._lock:
+            return {
+                "elapsed_seconds": round(time.monotonic() - self.started_at, 3),
+                "counters": {name: [dict(key, value=value) for key, value in series.items()] for name, series in self.counters.items()},
+                "histograms": {name: [dict(key, **histogram.summary()) for key, histogram in series.items()]
+                               for name, series in self.histograms.items()},
+            }
+
+    def prometheus(self):
+        """Returns the metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append(f"# TYPE {PREFIX}{name} counter")
+                lines.extend(f"{PREFIX}{name}{format_labels(key)} {value}" for key, value in sorted(series.items()))
+            for name, series in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{PREFIX}{name}_bucket{format_labels(key, [('le', le)])} {cumulative}")
+                    lines.append(f"{PREFIX}{name}_sum{format_labels(key)} {histogram.sum:.6f}")
+                    lines.append(f"{PREFIX}{name}_count{format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, prefix):
+        """Writes the JSON summary to PREFIX.json and the Prometheus text to PREFIX.prom."""
+        with open(f"{prefix}.json", "w", encoding="utf-8") as summary_file:
+            json.dump(self.summary(), summary_file, indent=2)
+        with open(f"{prefix}.prom", "w", encoding="utf-8") as prometheus_file:
+            prometheus_file.write(self.prometheus())
+        print(f"Metrics saved to {prefix}.json and {prefix}.prom")
+
+    def status_line(self):
+        """Returns a one-line snapshot: requests, rate, latency, bytes, cache hits, retries and parse time."""
+        elapsed = time.monotonic() - self.started_at
+        requests = self.total("http_requests_total")
+        latency = self.merged_histogram("http_request_seconds")
+        p50 = latency.percentile(0.5)
+        parse = self.merged_histogram("parse_seconds")
+        return (f"[{elapsed:6.1f}s] {requests} requests ({requests / elapsed if elapsed else 0:.1f}/s, "
+                f"p50 {p50 * 1000 if p50 else 0:.0f} ms), {self.total('http_response_bytes_total') / 1e6:.1f} MB, "
+                f"{self.total('cache_lookups_total', result='hits')} cache hits, {self.total('http_retries_total')} retries, "
+                f"{parse.count} pages parsed in {parse.sum:.2f}s")
+
+    def start_live(self, interval=1.0, write=None):
+        """Prints the status line every interval seconds until stop_live(); write defaults to stderr."""
+        write = write or (lambda line: print(line, file=sys.stderr, flush=True))
+        stop = threading.Event()
+
+        def report():
+            while not stop.wait(interval):
+                write(self.status_line())
+
+        thread = threading.Thread(target=report, daemon=True)
+        thread.start()
+        self._live = (stop, thread)
+
+    def stop_live(self):
+        if self._live:
+            stop, thread = self._live
+            stop.set()
+            thread.join()
+            self._live = None
+
+
+# One registry per process, shared by every session and stage of the tool
+METRICS = Metrics()
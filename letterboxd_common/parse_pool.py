@@ -0,0 +1,45 @@
+"""Process pool for the CPU-bound HTML parsing stage.
+
+Fetching stays on threads, which spend their time waiting on the network.
+Parsing (html.parser, BeautifulSoup, the poster-grid tokenizer) is pure-Python
+work that holds the GIL, so those same threads cannot parse in parallel. Once
+PARSE_POOL is started, a thread that has fetched a page hands the raw page to a
+worker process and waits for the extracted records, which are all that comes
+back. Many threads can wait at once, so parse throughput scales with cores.
+
+Until PARSE_POOL.start() is called every parse runs inline in the calling
+thread, as before. Parse functions must be module-level so they can be pickled.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+class ParsePool:
+    """Runs parse functions in worker processes once started, and inline until then."""
+
+    def __init__(self):
+        self.workers = 0
+        self._executor = None
+
+    def start(self, workers=None):
+        """Starts `workers` parse processes (default: one per core); call it before any fetch threads are running."""
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        # Launch the workers now, while the process is still single-threaded, rather than on the first parse
+        self._executor.submit(int).result()
+
+    def run(self, function, *args):
+        """Returns function(*args), computed in a parse process when the pool is started."""
+        if self._executor is None:
+            return function(*args)
+        return self._executor.submit(function, *args).result()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+            self.workers = 0
+
+
+# One pool per process, shared by every fetch thread of the tool
+PARSE_POOL = ParsePool()
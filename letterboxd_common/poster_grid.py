@@ -0,0 +1,163 @@
+"""Poster-grid extraction for Letterboxd film list pages.
+
+Rated pages and watchlist pages share the same ``li.poster-container`` grid.
+Every backend here returns the same plain poster dicts plus the page count
+from the pagination block, so scrapers never hold on to a parse tree: every
+field is a plain str (lxml's XPath "smart" strings would keep a reference to
+their element, and with it the whole page), and the BeautifulSoup tree is
+decomposed once its fields are read, since its parent/child reference cycles
+would otherwise keep it alive until the next cyclic garbage collection.
+
+- ``lxml``: C parser with XPath, the fastest when lxml is installed.
+- ``stream``: a standard-library tokenizer that starts at the first poster and
+  only records fields inside poster containers and the pagination block.
+- ``bs4``: the original BeautifulSoup html.parser path, kept as a fallback.
+"""
+import os
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+
+def poster(title=None, href=None, target_link=None, rating=None):
+    """Returns a poster dict: image alt text, first link, data-target-link and rating text."""
+    return {"title": title, "href": href, "target_link": target_link, "rating": rating}
+
+
+def page_number(text):
+    text = text.strip()
+    return int(text) if text.isdigit() else None
+
+
+def extract_page_bs4(html):
+    soup = BeautifulSoup(html, "html.parser")
+    posters = []
+    for container in soup.select("li.poster-container"):
+        img = container.find("img")
+        link_tag = container.find("a")
+        film_poster = container.select_one("[data-target-link]")
+        rating_tag = container.find("span", class_="rating")
+        posters.append(poster(
+            img.get("alt") if img else None,
+            link_tag.get("href") if link_tag else None,
+            film_poster["data-target-link"] if film_poster else None,
+            rating_tag.text.strip() if rating_tag else None,
+        ))
+    pages = [page_number(page.text) for page in soup.select(".paginate-pages li")]
+    soup.decompose()
+    return posters, max(filter(None, pages), default=1)
+
+
+CLASS_XPATH = "contains(concat(' ', normalize-space(@class), ' '), ' {} ')"
+
+
+def extract_page_lxml(html):
+    if not html:
+        return [], 1
+    root = lxml.html.fromstring(html)
+    posters = []
+    for container in root.xpath(f"//li[{CLASS_XPATH.format('poster-container')}]"):
+        img = container.find(".//img")
+        link_tag = container.find(".//a")
+        target_links = container.xpath(".//@data-target-link", smart_strings=False)
+        rating_tags = container.xpath(f".//span[{CLASS_XPATH.format('rating')}]")
+        posters.append(poster(
+            img.get("alt") if img is not None else None,
+            link_tag.get("href") if link_tag is not None else None,
+            target_links[0] if target_links else None,
+            rating_tags[0].text_content().strip() if rating_tags else None,
+        ))
+    pages = [page_number(page.text_content()) for page in root.xpath(f"//*[{CLASS_XPATH.format('paginate-pages')}]//li")]
+    return posters, max(filter(None, pages), default=1)
+
+
+class PosterGridParser(HTMLParser):
+    """Tokenizer that only records fields inside poster containers and the pagination block."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.posters = []
+        self.pages = []
+        self.current = None
+        self.rating_text = None
+        self.pagination_depth = 0
+        self.page_text = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+        if self.pagination_depth:
+            if tag == "div":
+                self.pagination_depth += 1
+            elif tag == "li":
+                self.page_text = []
+        elif tag == "li" and "poster-container" in classes:
+            self.current = poster()
+            self.posters.append(self.current)
+        elif self.current is not None:
+            if tag == "img" and self.current["title"] is None:
+                self.current["title"] = attrs.get("alt")
+            elif tag == "a" and self.current["href"] is None:
+                self.current["href"] = attrs.get("href")
+            elif tag == "span" and "rating" in classes and self.current["rating"] is None:
+                self.rating_text = []
+            if self.current["target_link"] is None and "data-target-link" in attrs:
+                self.current["target_link"] = attrs["data-target-link"]
+        elif tag == "div" and "paginate-pages" in classes:
+            self.pagination_depth = 1
+
+    def handle_endtag(self, tag):
+        if self.pagination_depth:
+            if tag == "div":
+                self.pagination_depth -= 1
+            elif tag == "li" and self.page_text is not None:
+                self.pages.append(page_number("".join(self.page_text)))
+                self.page_text = None
+        elif self.current is not None:
+            if tag == "span" and self.rating_text is not None:
+                self.current["rating"] = "".join(self.rating_text).strip()
+                self.rating_text = None
+            elif tag == "li":
+                self.current = None
+
+    def handle_data(self, data):
+        if self.rating_text is not None:
+            self.rating_text.append(data)
+        elif self.page_text is not None:
+            self.page_text.append(data)
+
+
+def extract_page_stream(html):
+    if isinstance(html, bytes):
+        html = html.decode("utf-8", errors="replace")
+    # Everything before the first poster (head, navigation, header) is skipped without tokenizing
+    first_poster = html.find("poster-container")
+    parser = PosterGridParser()
+    parser.feed(html[html.rfind("<", 0, first_poster):] if first_poster > 0 else html)
+    parser.close()
+    return parser.posters, max(filter(None, parser.pages), default=1)
+
+
+BACKENDS = {"bs4": extract_page_bs4, "stream": extract_page_stream}
+if lxml is not None:
+    BACKENDS["lxml"] = extract_page_lxml
+
+DEFAULT_BACKEND = os.environ.get("POSTER_GRID_BACKEND") or ("lxml" if "lxml" in BACKENDS else "stream")
+
+
+def extract_page(html, backend=None):
+    """Returns ([poster dicts], page count) for a poster-grid page using the chosen backend."""
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown poster grid backend '{backend}'. Choose from: {', '.join(sorted(BACKENDS))}")
+    return BACKENDS[backend](html)
+
+
+def extract_posters(html, backend=None):
+    """Returns the poster dicts of a poster-grid page."""
+    return extract_page(html, backend)[0]
@@ -0,0 +1,127 @@
+"""Adaptive per-host request scheduling for the Letterboxd and YTS scrapers.
+
+Each host gets a token bucket (requests per second) and a concurrency window.
+Both grow additively while responses are healthy and are halved when the host
+answers 429 or 503, and a Retry-After header pauses the host entirely until
+it expires (AIMD, as in TCP congestion control). Worker threads simply ask for
+a slot, so throughput settles at whatever rate each host tolerates instead of
+a fixed sleep between pages.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+THROTTLED_STATUSES = (429, 503)
+
+
+def parse_retry_after(value):
+    """Returns the Retry-After delay in seconds from a delta-seconds or HTTP-date value, or None."""
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HostLimiter:
+    """Token bucket and AIMD concurrency window for a single host."""
+
+    def __init__(self, rate=4.0, max_rate=50.0, min_rate=0.2, concurrency=4, max_concurrency=32, rate_step=0.5):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.rate_step = rate_step
+        self.concurrency = float(concurrency)
+        self.max_concurrency = max_concurrency
+        self.tokens = 1.0
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.updated_at = time.monotonic()
+        self.condition = threading.Condition()
+
+    def _refill(self, now):
+        # Bursts are capped at one second's worth of requests
+        self.tokens = min(max(self.rate, 1.0), self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self):
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    self.condition.wait(self.blocked_until - now)
+                elif self.in_flight >= int(self.concurrency):
+                    self.condition.wait()
+                elif self.tokens < 1:
+                    self.condition.wait((1 - self.tokens) / self.rate)
+                else:
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    return
+
+    def release(self, status=None, retry_after=None):
+        """Frees the slot and adapts the rate to the response status (None for a failed request)."""
+        with self.condition:
+            self.in_flight -= 1
+            if status in THROTTLED_STATUSES:
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.concurrency = max(1.0, self.concurrency / 2)
+                delay = parse_retry_after(retry_after)
+                if delay:
+                    self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+            elif status is not None and status < 500:
+                self.rate = min(self.max_rate, self.rate + self.rate_step)
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+            self.condition.notify_all()
+
+
+class RateLimiter:
+    """Hands out request slots per host, creating a HostLimiter the first time a host is seen."""
+
+    def __init__(self, host_settings=None):
+        self.host_settings = host_settings or {}
+        self.hosts = {}
+        self._lock = threading.Lock()
+
+    def for_host(self, host):
+        with self._lock:
+            if host not in self.hosts:
+                settings = next((settings for suffix, settings in self.host_settings.items()
+                                 if host == suffix or host.endswith(f".{suffix}")), {})
+                self.hosts[host] = HostLimiter(**settings)
+            return self.hosts[host]
+
+    @contextmanager
+    def slot(self, url):
+        """Waits for a request slot on the URL's host; call observe(response) on the yielded slot."""
+        limiter = self.for_host(urlsplit(url).hostname or "")
+        limiter.acquire()
+        outcome = {}
+        try:
+            yield Slot(outcome)
+        finally:
+            limiter.release(outcome.get("status"), outcome.get("retry_after"))
+
+
+class Slot:
+    def __init__(self, outcome):
+        self.outcome = outcome
+
+    def observe(self, response):
+        self.outcome["status"] = response.status_code
+        self.outcome["retry_after"] = response.headers.get("Retry-After")
+
+
+DEFAULT_HOST_SETTINGS = {
+    "letterboxd.com": {"rate": 4.0, "max_rate": 30.0, "concurrency": 4, "max_concurrency": 16},
+    "yts.mx": {"rate": 2.0, "max_rate": 20.0, "concurrency": 4, "max_concurrency": 16},
+}
+
+# One scheduler per process, shared by every session in the tool
+DEFAULT_LIMITER = RateLimiter(DEFAULT_HOST_SETTINGS)
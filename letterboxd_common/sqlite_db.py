@@ -0,0 +1,20 @@
+"""SQLite connections shared by the worker threads of one store.
+
+The HTTP cache index, the film catalog and the YTS mirror each open a single
+connection lazily and share it between threads. A sqlite3 connection must not
+be used by two threads at once, so each store guards every use of it, opening
+included, with its own lock; that lock also keeps multi-statement updates
+atomic.
+"""
+import os
+import sqlite3
+
+
+def open_shared(path, schema, row_factory=None):
+    """Opens the connection at path for use under the owner's lock and creates the schema."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    db = sqlite3.connect(path, check_same_thread=False)
+    if row_factory:
+        db.row_factory = row_factory
+    db.executescript(schema)
+    return db
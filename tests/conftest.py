@@ -0,0 +1,70 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The tools are scripts rather than packages, so their folders go on sys.path next to letterboxd_common
+sys.path[:0] = [ROOT, os.path.join(ROOT, "letterboxd-top-rated"), os.path.join(ROOT, "letterboxd-watchlist-wishlist"),
+                os.path.join(ROOT, "letterboxd-fan-finder"), os.path.join(ROOT, "benchmarks")]
+
+import stub_server  # noqa: E402
+from letterboxd_common.film_catalog import FilmCatalog  # noqa: E402
+from letterboxd_common.http_cache import CachedSession  # noqa: E402
+from letterboxd_common.rate_limit import DEFAULT_LIMITER  # noqa: E402
+
+UNTHROTTLED = {"rate": 1e6, "max_rate": 1e6, "concurrency": 64, "max_concurrency": 64}
+
+
+@pytest.fixture
+def stub(monkeypatch, tmp_path):
+    """A stub Letterboxd/YTS server answering injected errors with 500, which the session does not retry."""
+    server = stub_server.serve(error_status=500, rated_pages=4, watchlist_pages=4)
+    for host in ("127.0.0.1", "localhost"):
+        monkeypatch.setitem(DEFAULT_LIMITER.host_settings, host, UNTHROTTLED)
+    monkeypatch.chdir(tmp_path)  # Checkpoints and outputs are written to the current directory
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def session(tmp_path):
+    return CachedSession(str(tmp_path / "cache"), enabled=False)
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    return FilmCatalog(str(tmp_path / "films.sqlite3"))
+
+
+@pytest.fixture
+def top_rated(stub, monkeypatch):
+    import letterboxd_top_rated
+    monkeypatch.setattr(letterboxd_top_rated, "LETTERBOXD_BASE_URL", f"http://127.0.0.1:{stub.server_address[1]}")
+    return letterboxd_top_rated
+
+
+@pytest.fixture(scope="session")
+def watchlist_module():
+    spec = importlib.util.spec_from_file_location("watchlist", os.path.join(ROOT, "letterboxd-watchlist-wishlist", "letterboxd-watchlist-wishlist.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def watchlist(watchlist_module, stub, session, catalog, tmp_path, monkeypatch):
+    from library_index import LibraryIndex
+    from singleflight import SingleFlight
+    port = stub.server_address[1]
+    os.makedirs(tmp_path / "library")
+    monkeypatch.setattr(watchlist_module, "LETTERBOXD_BASE_URL", f"http://127.0.0.1:{port}")
+    monkeypatch.setattr(watchlist_module, "YTS_API_URL", f"http://localhost:{port}/api/v2/")
+    monkeypatch.setattr(watchlist_module, "SESSION", session)
+    monkeypatch.setattr(watchlist_module, "CATALOG", catalog)
+    monkeypatch.setattr(watchlist_module, "LIBRARY", LibraryIndex(str(tmp_path / "library"), str(tmp_path / "library.json")))
+    monkeypatch.setattr(watchlist_module, "YTS_LOOKUPS", SingleFlight("yts"))
+    monkeypatch.setattr(watchlist_module, "FILM_YEARS", SingleFlight("film_year"))
+    return watchlist_module
@@ -0,0 +1,70 @@
+import csv
+import glob
+import os
+
+from letterboxd_common.checkpoint import Checkpoint
+
+
+def read_column(filename, column):
+    with open(filename, newline="", encoding="utf-8") as file:
+        return [row[column] for row in csv.DictReader(file)]
+
+
+def test_top_rated_resume_continues_into_same_file(top_rated, stub, session, catalog, monkeypatch):
+    expected = [film["link"] for film in top_rated.scrape_letterboxd("bench", 1, session)]
+    record_films = top_rated.record_films
+
+    def fail_after_first_page(catalog, films):
+        record_films(catalog, films)
+        stub.error_rate = 1.0
+
+    monkeypatch.setattr(top_rated, "record_films", fail_after_first_page)
+    assert top_rated.save_user_films("bench", 1, session, catalog) is None
+    [part] = glob.glob("*.csv.part")
+    assert Checkpoint(".top-rated-bench.checkpoint.json").load()["last_page"] == 1
+
+    stub.error_rate = 0.0
+    monkeypatch.setattr(top_rated, "record_films", record_films)
+    filename = top_rated.save_user_films("bench", 1, session, catalog, resume=True)
+    assert filename == part[:-len(".part")]
+    assert read_column(filename, "link") == expected
+    assert not os.path.exists(".top-rated-bench.checkpoint.json")
+
+
+def test_watchlist_resume_continues_into_same_file(watchlist, stub, monkeypatch):
+    expected = [movie["Letterboxd URI"] for movie in watchlist.scrape_watchlist("bench")]
+
+    class FailAfterFirstPage(Checkpoint):
+        def save(self, **state):
+            super().save(**state)
+            stub.error_rate = 1.0
+
+    monkeypatch.setattr(watchlist, "Checkpoint", FailAfterFirstPage)
+    assert watchlist.save_watchlist("bench") is None
+    assert glob.glob("*.csv.part")
+
+    stub.error_rate = 0.0
+    monkeypatch.setattr(watchlist, "Checkpoint", Checkpoint)
+    movies = watchlist.save_watchlist("bench", resume=True)
+    assert [movie["Letterboxd URI"] for movie in movies] == expected
+    [filename] = glob.glob("watchlist-bench-*.csv")
+    assert read_column(filename, "Letterboxd URI") == expected
+    assert not glob.glob("*.part") and not os.path.exists(".watchlist-bench.checkpoint.json")
+
+
+def test_stream_keeps_part_file_until_every_film_is_saved(watchlist, stub, tmp_path):
+    expected = {movie["Letterboxd URI"] for movie in watchlist.scrape_watchlist("bench")}
+    output_dir = str(tmp_path / "torrents")
+    os.makedirs(output_dir)
+
+    stub.error_rate = 0.3
+    watchlist.stream_watchlist("bench", None, [], [], [], output_dir)
+    if glob.glob("*.csv.part"):
+        assert os.path.exists(".watchlist-bench.stream.checkpoint.json")
+        assert not glob.glob("watchlist-bench-*.csv")
+        stub.error_rate = 0.0
+        watchlist.stream_watchlist("bench", None, [], [], [], output_dir, resume=True)
+
+    [filename] = glob.glob("watchlist-bench-*.csv")
+    assert set(read_column(filename, "Letterboxd URI")) == expected
+    assert not glob.glob("*.part") and not os.path.exists(".watchlist-bench.stream.checkpoint.json")
@@ -0,0 +1,19 @@
+from title_index import TitleIndex
+
+
+def test_same_title_with_and_without_a_year():
+    index = TitleIndex([("Suspiria", 2018, "suspiria-2018"), ("Suspiria", None, "suspiria")])
+    assert [entry["slug"] for entry in index.candidates("suspiria")] == ["suspiria", "suspiria-2018"]
+    assert index.resolve("Suspiria (2018)")[0]["slug"] == "suspiria-2018"
+
+
+def test_build_from_catalog_and_reload(catalog, tmp_path):
+    from title_index import read_catalog
+    catalog.update_many([("the-godfather", "The Godfather", 1972, None), ("dune-2021", "Dune", 2021, None), ("dune", "Dune", None, None)])
+    index = TitleIndex(read_catalog(catalog.path))
+    index.save(str(tmp_path / "titles.tsv.gz"))
+    loaded = TitleIndex.load(str(tmp_path / "titles.tsv.gz"))
+    assert len(loaded) == 3
+    assert loaded.complete("godf") == [{"title": "The Godfather", "year": 1972, "slug": "the-godfather"}]
+    assert loaded.slug_for("Dune (2021)") == "dune-2021"
+    assert loaded.slug_for("Dune") == "dune"